@@ -0,0 +1,403 @@
+"""
+Endpoint micro-benchmarks on synthetic question banks.
+
+For every bank size, the script creates a database, migrates it, fills it
+with the categories of trivia.psql and random questions, and then calls
+every route of the API through the Flask test client. It reports the
+p50/p95/p99 latency, the CPU time and the response size of each route, and
+the peak of memory allocated while serving it. The results are written as
+JSON so that two versions can be compared with --compare.
+
+    python benchmarks/bench_endpoints.py --sizes 1000,100000 --output bench.json
+    python benchmarks/bench_endpoints.py --sizes 1000 --compare bench.json
+
+With --accept-encoding every request accepts compressed responses, so the
+sizes and the CPU times show the cost and the savings of the compression,
+tuned with the COMPRESS_* settings of the environment.
+
+    COMPRESS_LEVEL=1 python benchmarks/bench_endpoints.py --accept-encoding gzip
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+BACKEND_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_PATH)
+
+from flaskr import create_app
+from models import Category, Question, QuestionCount, db, migrate_db
+
+DEFAULT_SIZES = "1000,100000,1000000"
+
+# words of the synthetic questions, also used as search terms
+WORDS = (
+    "ancient river capital painter planet element battle composer island "
+    "mountain theory empire novel ocean symphony desert treaty galaxy "
+    "cathedral olympic molecule dynasty volcano sculpture reactor glacier "
+    "pharaoh orbit sonnet harbor"
+).split()
+
+# routes measured for every size: name -> function(client, state) -> response
+ROUTES = {}
+
+
+def route(name):
+    def decorator(function):
+        ROUTES[name] = function
+        return function
+
+    return decorator
+
+
+def read_categories():
+    """Read the categories of the trivia.psql dump."""
+    with open(os.path.join(BACKEND_PATH, "trivia.psql")) as dump:
+        block = re.search(
+            r"COPY public\.categories \(id, type\) FROM stdin;\n(.*?)\n\\\.",
+            dump.read(),
+            re.S,
+        )
+
+    return [line.split("\t") for line in block.group(1).splitlines()]
+
+
+def fill_database(app, size, seed):
+    """Insert the trivia categories and `size` random questions."""
+    generator = random.Random(seed)
+
+    with app.app_context():
+        for category_id, category_type in read_categories():
+            category = Category(category_type)
+            category.id = int(category_id)
+            db.session.add(category)
+        db.session.commit()
+
+        batch = []
+        for number in range(size):
+            words = generator.sample(WORDS, 6)
+            batch.append(
+                {
+                    "question": f"Which {' '.join(words)} is number {number}?",
+                    "answer": generator.choice(WORDS),
+                    "difficulty": generator.randint(1, 5),
+                    "category": generator.randint(1, 6),
+                }
+            )
+
+            if len(batch) == 10000:
+                Question.bulk_insert(batch)
+                batch = []
+
+        if batch:
+            Question.bulk_insert(batch)
+
+        # fill the counters once, like the first migration does
+        QuestionCount.rebuild()
+
+
+@route("list")
+def list_questions(client, state):
+    page = state["random"].randint(1, max(state["size"] // 10, 1))
+    return client.get(f"/questions?page={page}", headers=state["headers"])
+
+
+@route("list_after_id")
+def list_questions_after_id(client, state):
+    after_id = state["random"].randint(0, max(state["size"] - 10, 0))
+    return client.get(f"/questions?after_id={after_id}", headers=state["headers"])
+
+
+@route("categories")
+def list_categories(client, state):
+    return client.get("/categories", headers=state["headers"])
+
+
+@route("category_questions")
+def list_category_questions(client, state):
+    category_id = state["random"].randint(1, 6)
+    page = state["random"].randint(1, max(state["size"] // 60, 1))
+    return client.get(
+        f"/categories/{category_id}/questions?page={page}", headers=state["headers"]
+    )
+
+
+@route("search")
+def search_questions(client, state):
+    term = " ".join(state["random"].sample(WORDS, 2))
+    return client.post(
+        "/questions/search", json={"searchTerm": term}, headers=state["headers"]
+    )
+
+
+@route("quizzes")
+def play_quiz(client, state):
+    previous_questions = [state["random"].randint(1, state["size"]) for _ in range(4)]
+    return client.post(
+        "/quizzes",
+        json={
+            "previous_questions": previous_questions,
+            "quiz_category": {"type": "Science", "id": "1"},
+        },
+        headers=state["headers"],
+    )
+
+
+@route("create")
+def create_question(client, state):
+    response = client.post(
+        "/questions",
+        json={
+            "question": "Which benchmark question is this?",
+            "answer": "A synthetic one",
+            "difficulty": 1,
+            "category": 1,
+        },
+        headers=state["headers"],
+    )
+    state["created"].append(response.get_json()["created"])
+    return response
+
+
+@route("delete")
+def delete_question(client, state):
+    return client.delete(
+        f"/questions/{state['created'].pop()}", headers=state["headers"]
+    )
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def measure(client, function, state, requests, memory_requests):
+    """Call a route `requests` times and summarize its cost."""
+    latencies = []
+    cpu_times = []
+    sizes = []
+    statuses = set()
+
+    for _ in range(requests):
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+
+        response = function(client, state)
+
+        cpu_times.append(time.process_time() - cpu_started)
+        latencies.append(time.perf_counter() - started)
+        sizes.append(len(response.data))
+        statuses.add(response.status_code)
+
+    # measure the allocations on a few more requests, traced apart
+    # because tracing slows down every allocation
+    tracemalloc.start()
+    for _ in range(memory_requests):
+        function(client, state)
+    allocated_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "statuses": sorted(statuses),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "cpu_ms": round(sum(cpu_times) / requests * 1000, 3),
+        "bytes": round(sum(sizes) / requests),
+        "allocated_peak_kib": round(allocated_peak / 1024, 1),
+    }
+
+
+def run_size(size, requests, memory_requests, database_url, seed, accept_encoding):
+    """Benchmark every route on a bank of `size` questions."""
+    print(f"filling {size} questions...", file=sys.stderr)
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    migrate_db(app)
+
+    started = time.perf_counter()
+    fill_database(app, size, seed)
+    fill_seconds = time.perf_counter() - started
+
+    client = app.test_client()
+    results = {"fill_seconds": round(fill_seconds, 3), "routes": {}}
+
+    with app.app_context():
+        state = {
+            "size": size,
+            "random": random.Random(seed),
+            "created": [],
+            "headers": {"Accept-Encoding": accept_encoding or "identity"},
+        }
+
+        for name, function in ROUTES.items():
+
+            # the first call loads the in-process caches and indexes
+            if name != "delete":
+                function(client, state)
+
+            print(f"  {name}", file=sys.stderr)
+            results["routes"][name] = measure(
+                client, function, state, requests, memory_requests
+            )
+
+        # remove the questions created but not deleted by the benchmark
+        for question_id in state["created"]:
+            client.delete(f"/questions/{question_id}")
+
+    results["max_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return results
+
+
+def compare(current, previous):
+    """
+    Print the change of the p95 latency, the CPU time and the response size
+    of every route from a previous run.
+    """
+    for size, results in current["sizes"].items():
+        before = previous["sizes"].get(size)
+        if before is None:
+            continue
+
+        print(f"{size} questions")
+        for name, stats in results["routes"].items():
+            old = before["routes"].get(name)
+            if old is None:
+                continue
+
+            for key, label, unit in (
+                ("p95_ms", "p95", "ms"),
+                ("cpu_ms", "cpu", "ms"),
+                ("bytes", "size", "B"),
+            ):
+                if not old.get(key):
+                    continue
+
+                change = (stats[key] - old[key]) / old[key] * 100
+                print(
+                    f"  {name:20} {label:4} {old[key]:9.3f} -> {stats[key]:9.3f} "
+                    f"{unit:2} ({change:+.1f}%)"
+                )
+
+
+def git_revision():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=BACKEND_PATH,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", default=DEFAULT_SIZES, help="comma separated bank sizes"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=200, help="timed requests per route"
+    )
+    parser.add_argument(
+        "--memory-requests",
+        type=int,
+        default=10,
+        help="requests per route traced for allocations",
+    )
+    parser.add_argument(
+        "--database-url",
+        help="URL of a throwaway database with {size} in it, "
+        "a temporary SQLite file by default",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--accept-encoding",
+        help="Accept-Encoding of every request, like gzip or br, "
+        "uncompressed responses by default",
+    )
+    parser.add_argument("--single-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="file to write the JSON results to")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    # benchmark a single size in this process, for the parent process
+    if args.single_size is not None:
+        results = run_size(
+            args.single_size,
+            args.requests,
+            args.memory_requests,
+            args.database_url,
+            args.seed,
+            args.accept_encoding,
+        )
+        print(json.dumps(results))
+        return
+
+    report = {
+        "revision": git_revision(),
+        "date": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "requests": args.requests,
+        "accept_encoding": args.accept_encoding,
+        "sizes": {},
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            if args.database_url:
+                database_url = args.database_url.format(size=size)
+            else:
+                database_url = "sqlite:///" + os.path.join(
+                    directory, f"bench_{size}.db"
+                )
+
+            # run every size in its own process, so the in-process indexes
+            # and the peak memory of one size do not leak into the next
+            output = subprocess.check_output(
+                [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    f"--single-size={size}",
+                    f"--requests={args.requests}",
+                    f"--memory-requests={args.memory_requests}",
+                    f"--database-url={database_url}",
+                    f"--seed={args.seed}",
+                ]
+                + (
+                    [f"--accept-encoding={args.accept_encoding}"]
+                    if args.accept_encoding
+                    else []
+                )
+            )
+            report["sizes"][str(size)] = json.loads(output)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as results:
+            results.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(report, json.load(previous))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,131 @@
 import os
 import sys
-from flask import Flask, request, abort, json, jsonify
+import click
+from flask import Flask, request, abort, g, json, jsonify, stream_with_context
+from sqlalchemy import inspect
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-import random
-from sqlalchemy import true
 from werkzeug.exceptions import HTTPException
-from models import setup_db, Question, Category, db
+from models import setup_db, migrate_db, pool_status, primary_reads
+from models import Question, QuestionCount, db
+from models import QUESTIONS_VERSION, CATEGORIES_VERSION
+from .quiz_index import quiz_index, quiz_category
+from .search_index import search_index, fuzzy_threshold
+from .suggest_index import suggest_index, SUGGEST_SIZE
+from .category_cache import category_cache
+from .validation import validate_question
+from .filters import question_filters
+from .bulk_import import import_questions, IMPORT_BATCH_SIZE, IMPORT_FORMATS
+from .export import export_questions, EXPORT_FORMATS
+from .serialization import QUESTION_COLUMNS, format_rows, json_response
+from .conditional import conditional
+from .metrics import request_metrics, server_timing
+from .replicas import read_only, remember_write
+from .compression import compress
+from .admission import admission, limited, setup_admission
+from .quiz_sessions import quiz_sessions, setup_quiz_sessions
 
 QUESTIONS_PER_PAGE = 10
 
+# questions dealt by the quiz deck route, by default and at most
+QUIZ_DECK_SIZE = 5
+QUIZ_DECK_MAX_SIZE = 50
+
+# CORS headers added to every response
+ACCESS_CONTROL_HEADERS = (
+    ("Access-Control-Allow-Headers", "Content-Type, Authorization, true"),
+    ("Access-Control-Allow-Methods", "GET,PUT,POST,DELETE,OPTIONS"),
+)
+
+
 # Create pagination method for questions pages
-def paginate_questions(request, data):
+def paginate_questions(request, selection):
 
     # retrieve the page number on the request
     page = request.args.get("page", 1, type=int)
 
-    # calculate the start question based on the requested page
-    start = (page - 1) * QUESTIONS_PER_PAGE
+    # retrieve the optional keyset cursor (last id seen by the client)
+    after_id = request.args.get("after_id", None, type=int)
 
-    # calculate the ending question
-    end = start + QUESTIONS_PER_PAGE
+    # keyset mode: seek past the last seen id instead of skipping rows,
+    # so deep pages cost the same as the first one
+    if after_id is not None:
+        selection = selection.filter(Question.id > after_id).order_by(Question.id)
 
-    # applies the Question.format method on data received
-    questions_paginated = [Question.format() for Question in data]
+    # offset mode: calculate the start question based on the requested page
+    else:
+        selection = selection.order_by(Question.id).offset(
+            max(page - 1, 0) * QUESTIONS_PER_PAGE
+        )
+
+    # let the database return only the columns of the rows of the requested page
+    current_questions = (
+        selection.with_entities(*QUESTION_COLUMNS).limit(QUESTIONS_PER_PAGE).all()
+    )
 
-    # creates the return dictionary from start to end questions
-    current_questions_page = questions_paginated[start:end]
+    # format the rows like the Question.format method, without ORM objects
+    current_questions_page = format_rows(current_questions)
 
     return current_questions_page
 
 
+# Create the response of question writes
+def write_response(request, response):
+
+    # the page of questions is only sent to the clients that ask for it,
+    # so that a write does not read the questions table
+    if request.args.get("full", "false").lower() == "true":
+        response["questions"] = paginate_questions(request, Question.query)
+
+    return json_response(response)
+
+
+# Fetch the quiz questions drawn from the index
+def fetch_quiz_questions(question_ids):
+
+    # fetch the questions in a single query
+    query_questions = (
+        db.session.query(*QUESTION_COLUMNS).filter(Question.id.in_(question_ids)).all()
+        if question_ids
+        else []
+    )
+
+    # a replica may not have the newest questions of the index yet
+    missing = set(question_ids) - {row.id for row in query_questions}
+    if missing:
+        with primary_reads():
+            query_questions += (
+                db.session.query(*QUESTION_COLUMNS)
+                .filter(Question.id.in_(missing))
+                .all()
+            )
+
+        # the questions deleted elsewhere are left out, and the index reloads
+        if len(query_questions) < len(question_ids):
+            quiz_index.reset()
+
+    # keep the random order of the draw
+    query_questions.sort(key=lambda row: question_ids.index(row.id))
+    return format_rows(query_questions)
+
+
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
+
+    # apply the test or deployment settings before binding the database
+    if test_config is not None:
+        app.config.update(test_config)
+
     setup_db(app)
+    setup_admission(app)
+    setup_quiz_sessions(app)
+
+    @app.cli.command("upgrade-db")
+    @click.argument("revision", default="head")
+    def upgrade_db_command(revision):
+        """Create or upgrade the database schema with the alembic migrations."""
+        migrate_db(app, revision)
 
     """
     @OK: Set up CORS. Allow '*' for origins. Delete the sample route after completing the TODOs
@@ -46,15 +137,28 @@ def create_app(test_config=None):
 
     CORS(app)
 
+    # start measuring the request
+    @app.before_request
+    def before_request():
+        request_metrics.start()
+
     # CORS Headers
     @app.after_request
     def after_request(response):
-        response.headers.add(
-            "Access-Control-Allow-Headers", "Content-Type, Authorization, true"
-        )
-        response.headers.add(
-            "Access-Control-Allow-Methods", "GET,PUT,POST,DELETE,OPTIONS"
-        )
+        for name, value in ACCESS_CONTROL_HEADERS:
+            response.headers.add(name, value)
+
+        # let the client read its own writes from the primary
+        remember_write(response)
+
+        # compress large bodies for the clients that accept it
+        compress(response)
+
+        # record the request and tell the client where its time went
+        measured = request_metrics.finish(response)
+        if measured is not None:
+            response.headers["Server-Timing"] = server_timing(measured)
+
         return response
 
     """
@@ -74,57 +178,138 @@ def create_app(test_config=None):
         # create the data JSON object
         data = request.get_json()
 
-        # create the question_data dictionary from data
-        question_data = {
-            "question": data["question"],
-            "answer": data["answer"],
-            "difficulty": data["difficulty"],
-            "category": data["category"],
-        }
+        # create the question_data dictionary from data and check if it is valid
+        try:
+            question_data = validate_question(data)
 
-        # check if the data is valid
-        if (
-            (question_data["answer"] != "")
-            & (question_data["question"] != "")
-            & (question_data["category"] is not None)
-            & (question_data["difficulty"] is not None)
-        ):
+        # if the data is not valid, abort
+        except ValueError:
+            abort(400)
 
-            # use the try-except method to insert the data
-            try:
-                new_question = Question(
-                    question=question_data["question"],
-                    answer=question_data["answer"],
-                    category=question_data["category"],
-                    difficulty=question_data["difficulty"],
-                )
+        # use the try-except method to insert the data
+        try:
+            new_question = Question(
+                question=question_data["question"],
+                answer=question_data["answer"],
+                category=question_data["category"],
+                difficulty=question_data["difficulty"],
+            )
+
+            new_question.insert()
+
+            # read the new id without reloading the committed question
+            question_id = inspect(new_question).identity[0]
+
+            # return the data
+            return write_response(
+                request,
+                {
+                    "success": True,
+                    "created": question_id,
+                    "inserted_question": question_data,
+                    "total_questions": QuestionCount.total_of(),
+                },
+            )
+
+        # if insert fails, abort
+        except:
+            abort(400)
 
-                new_question.insert()
+    """
+    Create an endpoint to import many questions at once.
 
-                # query questions
-                query_questions = Question.query.order_by(Question.id).all()
+    The body is streamed as NDJSON, one question per line, or as CSV with
+    a question,answer,difficulty,category header. Every row is validated
+    like a single question and the valid ones are inserted in batches.
+    """
 
-                # paginate the query
-                questions_paginated = paginate_questions(request, query_questions)
+    @app.route("/questions/import", methods=["POST"])
+    def import_questions_stream():
 
-                # return the data
-                return jsonify(
-                    {
-                        "success": True,
-                        "questions": questions_paginated,
-                        "inserted_question": question_data,
-                        "total_questions": len(query_questions),
-                    }
-                )
+        # retrieve the format from the request, or guess it from the content type
+        import_format = request.args.get(
+            "format", "csv" if request.mimetype == "text/csv" else "ndjson"
+        )
 
-            # if insert fails, abort
-            except:
-                abort(400)
+        # retrieve the batch size from the request
+        batch_size = request.args.get("batch_size", IMPORT_BATCH_SIZE, type=int)
 
-        # if the data is not valid, abort
-        else:
+        # check if the format is supported and the batches hold a row
+        if import_format not in IMPORT_FORMATS or batch_size < 1:
+            abort(400)
+
+        # stream the body into the database
+        report = import_questions(request.stream, import_format, batch_size=batch_size)
+
+        # return the import report
+        return jsonify(
+            {
+                "success": True,
+                "total_questions": QuestionCount.total_of(),
+                **report,
+            }
+        )
+
+    @app.cli.command("import-questions")
+    @click.argument("file", type=click.File("rb"))
+    @click.option("--format", "import_format", type=click.Choice(IMPORT_FORMATS))
+    @click.option(
+        "--batch-size",
+        type=click.IntRange(min=1),
+        default=IMPORT_BATCH_SIZE,
+        show_default=True,
+    )
+    def import_questions_command(file, import_format, batch_size):
+        """Import the questions of an NDJSON or CSV file."""
+
+        # guess the format from the file extension when it is not given
+        if import_format is None:
+            import_format = "csv" if file.name.endswith(".csv") else "ndjson"
+
+        report = import_questions(file, import_format, batch_size=batch_size)
+
+        click.echo(
+            f"imported {report['imported']} questions, "
+            f"rejected {report['rejected']} rows "
+            f"({report['failed_batches']} failed batches) "
+            f"in {report['seconds']}s ({report['rows_per_second']} rows/s)"
+        )
+        for reject in report["rejects"]:
+            click.echo(f"row {reject['row']}: {reject['error']}", err=True)
+
+    """
+    Create an endpoint to export the questions.
+
+    The questions are streamed as NDJSON or CSV in id order, with the same
+    filters as the questions list, and memory does not grow with their number.
+    """
+
+    @app.route("/questions/export")
+    @read_only
+    def export_questions_stream():
+
+        # retrieve the format from the request and check it is supported
+        export_format = request.args.get("format", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            abort(400)
+
+        # read the filters of the request, a bad filter is a bad request
+        try:
+            filters = question_filters(request.args)
+        except ValueError:
             abort(400)
 
+        # stream the questions while they are read
+        response = app.response_class(
+            stream_with_context(export_questions(filters, export_format)),
+            mimetype=EXPORT_FORMATS[export_format],
+        )
+        response.headers["Content-Disposition"] = (
+            f"attachment; filename=questions.{export_format}"
+        )
+
+        return response
+
     """
     @OK:
     Create an endpoint to handle GET requests for questions,
@@ -136,27 +321,31 @@ def create_app(test_config=None):
     you should see questions and categories generated,
     ten questions per page and pagination at the bottom of the screen for three pages.
     Clicking on the page numbers should update the questions.
+
+    The questions can be filtered by difficulty, categories and ids,
+    and the total is then the number of questions of the filters.
     """
 
     @app.route("/questions")
+    @read_only
+    @conditional(QUESTIONS_VERSION, CATEGORIES_VERSION)
     def read_all_questions():
 
-        # using the try-except method to create the query
+        # read the filters of the request, a bad filter is a bad request
         try:
+            filters = question_filters(request.args)
+        except ValueError:
+            abort(400)
 
-            # create the query questions order by id
-            query_questions = Question.query.order_by(Question.id).all()
+        # using the try-except method to create the query
+        try:
 
-            # paginate the query
+            # paginate the filtered questions query
+            query_questions = Question.query.filter(*filters)
             questions_paginated = paginate_questions(request, query_questions)
 
-            # create query categories
-            query_categories = Category.query.order_by(db.desc(Category.id)).all()
-
-            # format the category to frontend
-            categories_formatted = {
-                category.id: category.type for category in query_categories
-            }
+            # read the categories formatted to frontend from the cache
+            categories_formatted = category_cache.get()
 
             # check if the query has no results and abort
             if len(questions_paginated) == 0:
@@ -164,16 +353,16 @@ def create_app(test_config=None):
 
             # if has results, return them
             else:
-                query_categories = {
-                    category.id: category.type for category in query_categories
-                }
-
-                return jsonify(
+                return json_response(
                     {
                         "success": True,
                         "questions": questions_paginated,
                         "categories": categories_formatted,
-                        "total_questions": len(query_questions),
+                        "total_questions": (
+                            query_questions.order_by(None).count()
+                            if filters
+                            else QuestionCount.total_of()
+                        ),
                         "current_category": "",
                     }
                 )
@@ -192,62 +381,174 @@ def create_app(test_config=None):
     TEST - OK: In the "Play" tab, after a user selects "All" or a category,
     one question at a time is displayed, the user is allowed to answer
     and shown whether they were correct or not.
+
+    A quiz session from /quizzes/sessions replaces both parameters with
+    its session_id, and the server remembers the questions it has shown.
     """
 
     @app.route("/quizzes", methods=["POST"])
+    @limited("quizzes")
+    @read_only
     def read_all_quizzes():
 
-        # create a force_end variable to terminate the quiz if needed
-        force_end = False
+        # using the try-except method to create the queries
+        try:
+            # create the data JSON object
+            data = request.get_json()
+
+            # retrieve the quiz session from data, if any
+            session_id = data.get("session_id")
+            if session_id is not None:
+                session = quiz_sessions.get(session_id)
+
+                # if the session is unknown or expired, abort
+                if session is None:
+                    abort(404)
+
+                # draw from the category of the session, skipping its seen set
+                category_id = session.category
+
+                def pick():
+                    drawn = quiz_index.deal_unseen(category_id, session.has_seen, 1)
+                    return drawn[0] if drawn else None
+
+            else:
+                # retrieve the category and the previous questions from data
+                category_id = quiz_category(data)
+                previous_questions = data["previous_questions"]
+
+                def pick():
+                    return quiz_index.pick(category_id, previous_questions)
+
+            # draw an unseen question id from the in-process index
+            question_id = pick()
+
+            # fetch only the selected question by primary key
+            while question_id is not None:
+                questions = fetch_quiz_questions([question_id])
+                if questions:
+                    break
+
+                # the question was deleted elsewhere, so draw again
+                question_id = pick()
+
+            # if there are no questions left, stop the quiz
+            if question_id is None:
+                return jsonify({"forceEnd": True, "success": True})
+
+            # remember the question in the session
+            if session_id is not None:
+                session.mark(question_id)
+                quiz_sessions.save(session_id, session)
+
+            # if not, continue with the question
+            return jsonify({"success": True, "question": questions[0]})
+
+        # if the query fails, abort
+        except:
+            abort(404)
+
+    """
+    Create a POST endpoint to get a whole quiz deck in one request.
+    It takes the same category and previous questions, or session, as
+    /quizzes, and the number of questions to deal, and returns them in
+    random order.
+
+    With start_session, it also starts a quiz session of the category
+    with the deck, and returns its session_id.
+    """
+
+    @app.route("/quizzes/deck", methods=["POST"])
+    @limited("quizzes")
+    @read_only
+    def read_quiz_deck():
 
         # using the try-except method to create the queries
         try:
             # create the data JSON object
             data = request.get_json()
 
-            # retrieve the category type from data
-            category_type = data["quiz_category"]["id"]
+            # retrieve the deck size from data
+            size = min(
+                max(int(data.get("size", QUIZ_DECK_SIZE)), 1), QUIZ_DECK_MAX_SIZE
+            )
 
-            # retrieve the previous questions from data
-            previous_questions = data["previous_questions"]
+            # retrieve the quiz session from data, if any
+            session_id = data.get("session_id")
+            started = session_id is None and bool(data.get("start_session"))
 
-            # if there is no specific category, query all, except the previous questions
-            if category_type == 0:
-                query_questions = Question.query.filter(
-                    Question.id.notin_(previous_questions)
-                ).all()
+            # start a new session of the category, saved with its first deck
+            if started:
+                session_id, session = quiz_sessions.start(quiz_category(data))
 
-            # if the category exists, filter by category
-            elif category_type:
-                query_questions = Question.query.filter(
-                    Question.category == category_type,
-                    Question.id.notin_(previous_questions),
-                ).all()
+            elif session_id is not None:
+                session = quiz_sessions.get(session_id)
 
-            # if there are no questions, create an empty result
-            if len(query_questions) == 0:
-                query_question = Question("", "", None, None).format()
+                # if the session is unknown or expired, abort
+                if session is None:
+                    abort(404)
 
-                # turn force_end true to stop the quiz
-                force_end = true
+            if session_id is not None:
+                # sample from the category of the session, skipping its seen set
+                question_ids = quiz_index.deal_unseen(
+                    session.category, session.has_seen, size
+                )
 
-            # if there are results select a randon question
             else:
-                query_question = random.choice(query_questions).format()
+                # retrieve the category and the previous questions from data
+                category_id = quiz_category(data)
+                previous_questions = data.get("previous_questions", [])
 
-            # check if there is a question and return it
-            if query_question:
+                # sample the unseen question ids from the in-process index
+                question_ids = quiz_index.deal(category_id, previous_questions, size)
 
-                # check if the force_end was raised and return it
-                if force_end:
-                    return jsonify({"forceEnd": True, "success": True})
+            # fetch the whole deck in a single query
+            questions = fetch_quiz_questions(question_ids)
 
-                # if not, continue with the question
-                else:
-                    return jsonify({"success": True, "question": query_question})
-            # if there are no results, abort
-            else:
-                abort(422)
+            # if there are no questions left, stop the quiz
+            if not questions:
+                return jsonify({"forceEnd": True, "success": True, "questions": []})
+
+            # create the response JSON object with the deck
+            response = {"success": True, "questions": questions}
+
+            # remember the dealt questions in the session
+            if session_id is not None:
+                for question in questions:
+                    session.mark(question["id"])
+                quiz_sessions.save(session_id, session)
+
+                # return the id of the new session
+                if started:
+                    response["session_id"] = session_id
+
+            # if not, deal the deck
+            return json_response(response)
+
+        # if the query fails, abort
+        except:
+            abort(404)
+
+    """
+    Create a POST endpoint to start a quiz session on the server.
+    It takes the category of the quiz, and returns the session_id that
+    /quizzes and /quizzes/deck take instead of the previous questions.
+    """
+
+    @app.route("/quizzes/sessions", methods=["POST"])
+    def create_quiz_session():
+
+        # using the try-except method to create the session
+        try:
+            # create the data JSON object
+            data = request.get_json()
+
+            # retrieve the category from data
+            category_id = quiz_category(data)
+
+            return jsonify(
+                {"success": True, "session_id": quiz_sessions.create(category_id)}
+            )
 
         # if the query fails, abort
         except:
@@ -255,13 +556,15 @@ def create_app(test_config=None):
 
     @app.route("/")
     @app.route("/categories")
+    @read_only
+    @conditional(CATEGORIES_VERSION)
     def read_all_categories():
 
         # using the try-except method to create the query
         try:
 
-            # create the query categories order by id
-            query_categories = Category.query.order_by(Category.id).all()
+            # read the categories from the cache
+            query_categories = category_cache.get()
 
             # check if the query has no results and abort
             if len(query_categories) == 0:
@@ -270,12 +573,10 @@ def create_app(test_config=None):
             # if has results, return them
             else:
 
-                return jsonify(
+                return json_response(
                     {
                         "success": True,
-                        "categories": {
-                            category.id: category.type for category in query_categories
-                        },
+                        "categories": query_categories,
                     }
                 )
 
@@ -293,30 +594,33 @@ def create_app(test_config=None):
     """
 
     @app.route("/categories/<int:category_id>/questions")
+    @read_only
+    @conditional(QUESTIONS_VERSION, CATEGORIES_VERSION)
     def read_single_category(category_id):
 
         # using the try-except method to create the query
         try:
 
             # create the query category type
-            query_category_type = Category.query.get(category_id).format()["type"]
+            query_category_type = category_cache.type_of(category_id)
+
+            # create the query questions filtered by category
+            query_questions = Question.query.filter(Question.category == category_id)
 
-            # create the query categories filtered by category
-            query_questions = Question.query.filter(
-                Question.category == category_id
-            ).all()
+            # read the maintained count of the category
+            total_questions = QuestionCount.total_of(category_id)
 
             # paginate the query
             questions_paginated = paginate_questions(request, query_questions)
 
             # check if the query results and return them
-            if len(query_questions):
+            if total_questions:
 
-                return jsonify(
+                return json_response(
                     {
                         "success": True,
                         "questions": questions_paginated,
-                        "total_questions": len(query_questions),
+                        "total_questions": total_questions,
                         "current_category": query_category_type,
                     }
                 )
@@ -335,12 +639,21 @@ def create_app(test_config=None):
     It should return any questions for whom the search term
     is a substring of the question.
 
+    The matches come from the in-process search index, which finds the
+    candidates by the words of the search term and then checks that the
+    whole term is in their text, so "itle" finds "title" and "entitled".
+    The results are ranked by relevance. With "fuzzy" set, the questions
+    with a word containing or similar to each word of the search term match
+    instead, in any order, so "wrld cupp" finds the World Cup.
+
     TEST - OK: Search by any phrase. The questions list will update to include
     only question that include that string within their question.
     Try using the word "title" to start.
     """
 
     @app.route("/questions/search", methods=["POST"])
+    @limited("search")
+    @read_only
     def search_question():
 
         # using the try-except method to create the query
@@ -352,22 +665,40 @@ def create_app(test_config=None):
             # retrieve the search term from data
             search_term = data["searchTerm"]
 
-            # create the query questions filtered by the search term
-            query_questions = Question.query.filter(
-                Question.question.ilike("%" + search_term + "%")
-            ).all()
-
-            # paginate the query
-            questions_paginated = paginate_questions(request, query_questions)
+            # in fuzzy mode, also match the words similar to the search term
+            threshold = fuzzy_threshold(app) if data.get("fuzzy") else None
+
+            # retrieve the page number on the request
+            page = request.args.get("page", 1, type=int)
+
+            # rank the matches in the search index and keep the requested page
+            total_questions, page_ids = search_index.search(
+                search_term,
+                offset=max(page - 1, 0) * QUESTIONS_PER_PAGE,
+                limit=QUESTIONS_PER_PAGE,
+                fuzzy_threshold=threshold,
+            )
+
+            # fetch only the questions of the page, in ranking order,
+            # and skip the query when the page has no matches
+            questions_page = []
+            if page_ids:
+                questions_page = (
+                    db.session.query(*QUESTION_COLUMNS)
+                    .filter(Question.id.in_(page_ids))
+                    .all()
+                )
+            questions_page.sort(key=lambda row: page_ids.index(row.id))
+            questions_paginated = format_rows(questions_page)
 
             # check if the query results and return them
-            if len(query_questions):
+            if total_questions:
 
-                return jsonify(
+                return json_response(
                     {
                         "success": True,
                         "questions": questions_paginated,
-                        "total_questions": len(query_questions),
+                        "total_questions": total_questions,
                         "current_category": "",
                     }
                 )
@@ -380,6 +711,32 @@ def create_app(test_config=None):
         except Exception:
             abort(422)
 
+    """
+    Create a GET endpoint to suggest the completions of a search term
+    while it is typed. The last word of the prefix is completed with the
+    words used by the most questions, from the in-process prefix index,
+    so no query runs on every key.
+    """
+
+    @app.route("/questions/suggest")
+    def suggest_questions():
+
+        # retrieve the prefix and the number of suggestions on the request
+        prefix = request.args.get("prefix", "")
+        limit = request.args.get("limit", SUGGEST_SIZE, type=int)
+
+        # if the number of suggestions is out of range, abort
+        if not 1 <= limit <= SUGGEST_SIZE:
+            abort(400)
+
+        return jsonify(
+            {
+                "success": True,
+                "prefix": prefix,
+                "suggestions": suggest_index.suggest(prefix, limit),
+            }
+        )
+
     """
     @OK:
     Create an endpoint to DELETE question using a question ID.
@@ -401,20 +758,14 @@ def create_app(test_config=None):
             if query_questions is not None:
                 query_questions.delete()
 
-                # create a new query questions with all questions
-                query_questions = Question.query.all()
-
-                # paginate the query
-                questions_paginated = paginate_questions(request, query_questions)
-
-                # return the JSON object with the paginated questions
-                return jsonify(
+                # return the JSON object with the new total
+                return write_response(
+                    request,
                     {
                         "success": True,
-                        "questions": questions_paginated,
-                        "total_questions": len(query_questions),
+                        "total_questions": QuestionCount.total_of(),
                         "deleted": question_id,
-                    }
+                    },
                 )
 
             # if the quere is empty, abort
@@ -425,6 +776,82 @@ def create_app(test_config=None):
         except Exception:
             abort(422)
 
+    """
+    Create an endpoint to DELETE many questions in one transaction,
+    using the list of question IDs in the "ids" field of the body.
+    """
+
+    @app.route("/questions", methods=["DELETE"])
+    def delete_questions():
+
+        # create the data JSON object
+        data = request.get_json(silent=True) or {}
+
+        # retrieve the question ids from data and check them, JSON booleans
+        # are ints in Python but not question ids
+        question_ids = data.get("ids")
+        if not isinstance(question_ids, list) or not all(
+            isinstance(question_id, int) and not isinstance(question_id, bool)
+            for question_id in question_ids
+        ):
+            abort(400)
+
+        # using the try-except method to delete the questions
+        try:
+
+            # delete the questions together, with a single statement
+            deleted = Question.bulk_delete(question_ids)
+
+            # if none of the questions exists, abort
+            if not deleted:
+                abort(422)
+
+            deleted = sorted(question["id"] for question in deleted)
+
+            # return the JSON object with the deleted ids and the new total
+            return write_response(
+                request,
+                {
+                    "success": True,
+                    "total_questions": QuestionCount.total_of(),
+                    "deleted": deleted,
+                },
+            )
+
+        # if the delete fails, abort
+        except Exception:
+            db.session.rollback()
+            abort(422)
+
+    """
+    Create an endpoint to watch the database connection pool:
+    connections in use and idle, overflow, and how long checkouts waited.
+    """
+
+    @app.route("/status/pool")
+    def read_pool_status():
+        return jsonify({"success": True, **pool_status()})
+
+    """
+    Create an endpoint to expose the request and pool metrics
+    in the Prometheus text format.
+    """
+
+    @app.route("/metrics")
+    def read_metrics():
+
+        # report the numeric pool values as gauges
+        gauges = {
+            f"db_pool_{name}": value
+            for name, value in pool_status().items()
+            if isinstance(value, (int, float))
+        }
+
+        return app.response_class(
+            request_metrics.render(gauges) + admission.render(),
+            mimetype="text/plain; version=0.0.4",
+        )
+
     @app.errorhandler(404)
     def not_found(error):
         return (
@@ -450,6 +877,22 @@ def create_app(test_config=None):
             405,
         )
 
+    @app.errorhandler(429)
+    def too_many_requests(error):
+        response = jsonify(
+            {"success": False, "error": 429, "message": "too many requests"}
+        )
+        response.headers["Retry-After"] = str(g.get("retry_after", 1))
+        return response, 429
+
+    @app.errorhandler(503)
+    def service_unavailable(error):
+        response = jsonify(
+            {"success": False, "error": 503, "message": "service unavailable"}
+        )
+        response.headers["Retry-After"] = str(g.get("retry_after", 1))
+        return response, 503
+
     @app.errorhandler(500)
     def internal_error(error):
         return (
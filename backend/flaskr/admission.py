@@ -0,0 +1,258 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import abort, g, request
+
+# clients whose token buckets are kept per route, the least recent are dropped
+MAX_CLIENTS = 10000
+
+
+def route_settings(app, name, convert):
+    """Read a `route=value,...` setting into a dictionary."""
+
+    value = app.config.get(name, os.getenv(name)) or {}
+    if isinstance(value, dict):
+        return {route: convert(limit) for route, limit in value.items()}
+
+    settings = {}
+    for item in value.split(","):
+        if item.strip():
+            route, limit = item.split("=")
+            settings[route.strip()] = convert(limit)
+    return settings
+
+
+class ConcurrencyLimit:
+    """
+    Requests in flight on a route, with a short queue in front of it.
+
+    A request waits at most `queue_timeout` seconds for a free slot, behind
+    at most `queue_size` other waiting requests, and is rejected otherwise.
+    """
+
+    def __init__(self, concurrency, queue_size, queue_timeout):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+
+    def acquire(self, wait=True):
+        with self.condition:
+            if self.in_flight < self.concurrency:
+                self.in_flight += 1
+                return True
+
+            if not wait or self.waiting >= self.queue_size:
+                return False
+
+            self.waiting += 1
+            try:
+                admitted = self.condition.wait_for(
+                    lambda: self.in_flight < self.concurrency, self.queue_timeout
+                )
+            finally:
+                self.waiting -= 1
+
+            if admitted:
+                self.in_flight += 1
+            return admitted
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+
+class RateLimit:
+    """
+    Token buckets of the clients of a route.
+
+    Every client gets `rate` tokens per second, up to `burst` tokens, and
+    every request takes one.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+
+        self.lock = threading.Lock()
+
+        # client -> (tokens, time of the last refill), least recent first
+        self.buckets = OrderedDict()
+
+    def take(self, client):
+        """Take a token, and return the seconds to wait when there is none."""
+
+        now = time.monotonic()
+        with self.lock:
+            tokens, refilled = self.buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - refilled) * self.rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.rate
+
+            self.buckets[client] = (tokens, now)
+            if len(self.buckets) > MAX_CLIENTS:
+                self.buckets.popitem(last=False)
+
+        return wait
+
+
+class AdmissionControl:
+    """
+    Concurrency and rate limits of the expensive routes.
+
+    The limits are set per route from the ADMISSION_* settings. A route
+    without a setting is not limited.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.configure({}, {}, {}, 0, 0.0, None)
+
+    def configure(self, concurrency, rates, bursts, queue_size, queue_timeout, header):
+        self.concurrency = {
+            route: ConcurrencyLimit(limit, queue_size, queue_timeout)
+            for route, limit in concurrency.items()
+        }
+        self.rates = {
+            route: RateLimit(rate, bursts.get(route, max(rate, 1)))
+            for route, rate in rates.items()
+        }
+        self.queue_timeout = queue_timeout
+        self.client_header = header
+
+        # (route, outcome) -> number of requests
+        with self.lock:
+            self.counts = {}
+
+    def count(self, route, outcome):
+        with self.lock:
+            self.counts[route, outcome] = self.counts.get((route, outcome), 0) + 1
+
+    def admit(self, route, client, wait=True):
+        """
+        Admit a request to a route, or return the status and the seconds of
+        the Retry-After of its rejection.
+        """
+
+        rate = self.rates.get(route)
+        if rate is not None:
+            retry_after = rate.take(client)
+            if retry_after:
+                self.count(route, "rate")
+                return 429, max(1, math.ceil(retry_after))
+
+        limit = self.concurrency.get(route)
+        if limit is not None and not limit.acquire(wait):
+            self.count(route, "concurrency")
+            return 503, max(1, math.ceil(self.queue_timeout))
+
+        self.count(route, "admitted")
+        return None
+
+    def release(self, route):
+        limit = self.concurrency.get(route)
+        if limit is not None:
+            limit.release()
+
+    def render(self):
+        """Render the counters and the queues in the Prometheus text format."""
+
+        lines = [
+            "# HELP trivia_admission_requests_total Requests admitted or rejected.",
+            "# TYPE trivia_admission_requests_total counter",
+        ]
+        with self.lock:
+            for (route, outcome), count in sorted(self.counts.items()):
+                lines.append(
+                    f'trivia_admission_requests_total{{route="{route}",'
+                    f'outcome="{outcome}"}} {count}'
+                )
+
+        for name, key in (("in_flight", "in_flight"), ("queue_depth", "waiting")):
+            lines.append(f"# TYPE trivia_admission_{name} gauge")
+            for route, limit in sorted(self.concurrency.items()):
+                lines.append(
+                    f'trivia_admission_{name}{{route="{route}"}} {getattr(limit, key)}'
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+def setup_admission(app):
+    """Set the limits of the routes from the app config or the environment."""
+
+    def setting(name, default):
+        value = app.config.get(name, os.getenv(name))
+        return default if value is None or value == "" else value
+
+    rates = route_settings(app, "ADMISSION_RATE", float)
+    bursts = route_settings(app, "ADMISSION_BURST", float)
+
+    # a bucket needs a positive rate, and room for at least one request
+    for route, rate in rates.items():
+        if not rate > 0:
+            raise ValueError(f"ADMISSION_RATE of {route} must be positive: {rate}")
+    for route, burst in bursts.items():
+        if not burst >= 1:
+            raise ValueError(f"ADMISSION_BURST of {route} must be at least 1: {burst}")
+
+    admission.configure(
+        route_settings(app, "ADMISSION_CONCURRENCY", int),
+        rates,
+        bursts,
+        int(setting("ADMISSION_QUEUE_SIZE", 0)),
+        float(setting("ADMISSION_QUEUE_TIMEOUT", 0.1)),
+        setting("ADMISSION_CLIENT_HEADER", None),
+    )
+
+
+def client_key():
+    """Key of the client of a request, for its token buckets."""
+
+    if admission.client_header:
+        key = request.headers.get(admission.client_header)
+        if key:
+            return key
+
+    return request.remote_addr
+
+
+def limited(route):
+    """
+    Admit the requests of a view under the limits of a route.
+
+    A client over its rate gets a 429, and a request that finds the route
+    full gets a 503, both with a Retry-After header.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            rejection = admission.admit(route, client_key())
+            if rejection is not None:
+                status, g.retry_after = rejection
+                abort(status)
+
+            try:
+                return view(*args, **kwargs)
+            finally:
+                admission.release(route)
+
+        return wrapper
+
+    return decorator
+
+
+admission = AdmissionControl()
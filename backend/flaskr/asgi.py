@@ -0,0 +1,381 @@
+"""
+ASGI entry point of the trivia API, for the async serving mode.
+
+    uvicorn --factory flaskr.asgi:create_asgi_app --workers 4
+
+The quiz route, polled by every player of a live quiz, is served natively on
+the event loop with asyncpg. It only waits on the database without holding a
+thread, so one process keeps thousands of quiz requests in flight. Every
+other route, and every route on databases other than Postgres, runs the
+Flask app in a thread pool. The routes and their JSON stay the same in both
+modes.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from sqlalchemy.engine.url import make_url
+
+from models import POOL_SETTINGS, QUESTIONS_VERSION
+from . import ACCESS_CONTROL_HEADERS, create_app
+from .admission import admission
+from .metrics import request_metrics, server_timing
+from .quiz_index import quiz_index, quiz_category
+from .quiz_sessions import quiz_sessions
+from .serialization import QUESTION_KEYS, json_encoder
+
+# asyncpg is only needed to serve the native routes
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+
+class ThreadedWsgiInstance(WsgiToAsgiInstance):
+
+    # asgiref runs every WSGI request on one shared thread by default,
+    # so run them in the thread pool of the loop instead
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__["run_wsgi_app"].func, thread_sensitive=False
+    )
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiInstance(self.wsgi_application)(scope, receive, send)
+
+
+class AsyncQuestionStore:
+    """
+    Async reads of the questions, on a pool of asyncpg connections.
+
+    The pool is sized and timed out like the SQLAlchemy pool of the app,
+    from the same DB_* settings. Every read adds its statement and its time
+    to the metrics of the request.
+    """
+
+    def __init__(self, app):
+        url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+        url.drivername = "postgresql"
+        self.dsn = str(url)
+
+        settings = {}
+        for setting, (option, convert) in POOL_SETTINGS.items():
+            value = app.config.get(setting, os.getenv(setting))
+            if value is not None and value != "":
+                settings[option] = convert(value)
+
+        self.min_size = settings.get("pool_size", 5)
+        self.max_size = self.min_size + settings.get("max_overflow", 10)
+        self.timeout = settings.get("pool_timeout", 30)
+
+        # abort the statements that run longer than the timeout, in milliseconds
+        self.server_settings = {}
+        statement_timeout = app.config.get(
+            "DB_STATEMENT_TIMEOUT", os.getenv("DB_STATEMENT_TIMEOUT")
+        )
+        if statement_timeout:
+            self.server_settings["statement_timeout"] = str(int(statement_timeout))
+
+        self.pool = None
+
+    async def open(self):
+        self.pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            server_settings=self.server_settings,
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def fetchrow(self, current, statement, *arguments):
+
+        # open the pool on first use, when the server has no lifespan events
+        if self.pool is None:
+            await self.open()
+
+        started = time.perf_counter()
+        async with self.pool.acquire(timeout=self.timeout) as connection:
+            row = await connection.fetchrow(statement, *arguments)
+
+        current["statements"] += 1
+        current["db_seconds"] += time.perf_counter() - started
+        current["rows"] += 1 if row is not None else 0
+
+        return row
+
+    async def version(self, current, name):
+        row = await self.fetchrow(
+            current, "SELECT version FROM data_versions WHERE name = $1", name
+        )
+        return (row and row["version"]) or 0
+
+    async def question(self, current, question_id):
+        row = await self.fetchrow(
+            current,
+            f"SELECT {', '.join(QUESTION_KEYS)} FROM questions WHERE id = $1",
+            question_id,
+        )
+        return dict(zip(QUESTION_KEYS, row)) if row is not None else None
+
+
+class TriviaASGI:
+    """
+    ASGI app that serves the native routes on the event loop, and every
+    other request with the Flask app.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi = ThreadedWsgiToAsgi(app)
+
+        # the native routes need asyncpg, a Postgres database, and the
+        # compact JSON of the Flask app outside of debug mode
+        backend = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+        pretty = app.config["JSONIFY_PRETTYPRINT_REGULAR"] or app.debug
+        if asyncpg is not None and backend == "postgresql" and not pretty:
+            self.store = AsyncQuestionStore(app)
+        else:
+            self.store = None
+
+        # (method, path) -> native route
+        self.routes = {("POST", "/quizzes"): self.read_all_quizzes}
+
+        self.reload_lock = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+
+        route = None
+        if scope["type"] == "http" and self.store is not None:
+            route = self.routes.get((scope["method"], scope["path"]))
+
+        if route is None:
+            await self.wsgi(scope, receive, send)
+        else:
+            await route(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+
+            if message["type"] == "lifespan.startup":
+                if self.store is not None:
+                    await self.store.open()
+                await send({"type": "lifespan.startup.complete"})
+
+            elif message["type"] == "lifespan.shutdown":
+                if self.store is not None:
+                    await self.store.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def ensure_current(self, current):
+        version = await self.store.version(current, QUESTIONS_VERSION)
+        if quiz_index.is_current(version):
+            return
+
+        # load the index once in a thread, while the other requests wait
+        if self.reload_lock is None:
+            self.reload_lock = asyncio.Lock()
+
+        async with self.reload_lock:
+            if not quiz_index.is_current(version):
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.load_index, version
+                )
+
+    def load_index(self, version):
+        with self.app.app_context():
+            quiz_index.load(version)
+
+    """
+    POST /quizzes, like the Flask route with the same name.
+    """
+
+    async def read_all_quizzes(self, scope, receive, send):
+        current = {
+            "started": time.perf_counter(),
+            "statements": 0,
+            "db_seconds": 0.0,
+            "rows": 0,
+        }
+
+        # reject the requests over the limits without waiting on the loop
+        rejection = admission.admit("quizzes", asgi_client_key(scope), wait=False)
+        if rejection is not None:
+            status, retry_after = rejection
+            message = "too many requests" if status == 429 else "service unavailable"
+            await self.respond(
+                send,
+                "read_all_quizzes",
+                "POST",
+                status,
+                {"success": False, "error": status, "message": message},
+                current,
+                [("Retry-After", str(retry_after))],
+            )
+            return
+
+        try:
+            await self.serve_quiz(scope, receive, send, current)
+        finally:
+            admission.release("quizzes")
+
+    async def serve_quiz(self, scope, receive, send, current):
+
+        # using the try-except method to create the queries
+        try:
+            # create the data JSON object
+            data = await read_json(scope, receive)
+            loop = asyncio.get_running_loop()
+
+            # retrieve the quiz session from data, if any, in a thread
+            # as a shared session store waits on the network
+            session_id = data.get("session_id")
+            if session_id is not None:
+                session = await loop.run_in_executor(
+                    None, quiz_sessions.get, session_id
+                )
+
+                # if the session is unknown or expired, answer like the Flask route
+                if session is None:
+                    raise LookupError(session_id)
+
+                # draw from the category of the session, skipping its seen set
+                category_id = session.category
+
+                def draw():
+                    drawn = quiz_index.draw_unseen(category_id, session.has_seen, 1)
+                    return drawn[0] if drawn else None
+
+            else:
+                # retrieve the category and the previous questions from data,
+                # a missing category is answered like the Flask route
+                category_id = quiz_category(data)
+                previous_questions = data["previous_questions"]
+
+                def draw():
+                    return quiz_index.draw(category_id, previous_questions)
+
+            # draw an unseen question id from the in-process index
+            await self.ensure_current(current)
+            question_id = draw()
+
+            # fetch only the selected question by primary key
+            question = None
+            while question_id is not None:
+                question = await self.store.question(current, question_id)
+
+                if question is not None:
+                    break
+
+                # the question was deleted elsewhere, so reload and draw again
+                quiz_index.reset()
+                await self.ensure_current(current)
+                question_id = draw()
+
+            # if there are no questions left, stop the quiz
+            if question_id is None:
+                status, payload = 200, {"forceEnd": True, "success": True}
+
+            # if not, continue with the question
+            else:
+                # remember the question in the session
+                if session_id is not None:
+                    session.mark(question_id)
+                    await loop.run_in_executor(
+                        None, quiz_sessions.save, session_id, session
+                    )
+
+                status, payload = 200, {"success": True, "question": question}
+
+        # if the query fails, abort
+        except Exception:
+            status, payload = 404, {
+                "success": False,
+                "error": 404,
+                "message": "resource not found",
+            }
+
+        await self.respond(send, "read_all_quizzes", "POST", status, payload, current)
+
+    async def respond(
+        self, send, endpoint, method, status, payload, current, extra_headers=()
+    ):
+        body = (json_encoder(self.app.config).encode(payload) + "\n").encode("utf-8")
+
+        current["seconds"] = time.perf_counter() - current["started"]
+        current["bytes"] = len(body)
+        request_metrics.record(endpoint, method, status, current)
+
+        # the headers of the Flask response, with flask-cors defaults
+        headers = [
+            ("Content-Type", self.app.config["JSONIFY_MIMETYPE"]),
+            ("Content-Length", str(len(body))),
+            ("Access-Control-Allow-Origin", "*"),
+            *ACCESS_CONTROL_HEADERS,
+            ("Server-Timing", server_timing(current)),
+            *extra_headers,
+        ]
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (name.encode("latin-1"), value.encode("latin-1"))
+                    for name, value in headers
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+async def read_json(scope, receive):
+    """Read the JSON body of a request, like Flask's request.get_json()."""
+
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+
+    # only JSON content types are parsed
+    headers = dict(scope["headers"])
+    mimetype = headers.get(b"content-type", b"").split(b";")[0].strip().decode()
+    if not (
+        mimetype == "application/json"
+        or (mimetype.startswith("application/") and mimetype.endswith("+json"))
+    ):
+        return None
+
+    return json.loads(body.decode("utf-8"))
+
+
+def asgi_client_key(scope):
+    """Key of the client of a request, like admission.client_key()."""
+
+    if admission.client_header:
+        headers = dict(scope["headers"])
+        key = headers.get(admission.client_header.lower().encode("latin-1"))
+        if key:
+            return key.decode("latin-1")
+
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def create_asgi_app(test_config=None):
+    return TriviaASGI(create_app(test_config))
@@ -0,0 +1,133 @@
+import codecs
+import csv
+import json
+import time
+
+from models import Question, db
+from .category_cache import category_cache
+from .validation import validate_question
+
+# number of rows sent to the database in each insert and commit
+IMPORT_BATCH_SIZE = 5000
+
+# number of rejected rows reported in detail, the rest are only counted
+MAX_REPORTED_REJECTS = 100
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+def read_rows(stream, import_format):
+    """Yield (row number, data) for every row of a binary stream."""
+
+    # decode the stream line by line, so memory does not grow with its size
+    lines = codecs.iterdecode(stream, "utf-8")
+
+    if import_format == "csv":
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, row
+
+    else:
+        for number, line in enumerate(lines, start=1):
+            line = line.strip()
+
+            # skip blank lines between the records
+            if not line:
+                continue
+
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+
+
+def insert_batch(batch):
+    """Insert and commit a batch, and return the reason it failed, if it did."""
+
+    try:
+        Question.bulk_insert(batch)
+
+    # roll the batch back, the batches before it stay committed
+    except Exception as error:
+        db.session.rollback()
+        return str(getattr(error, "orig", None) or error).strip().splitlines()[0]
+
+    return None
+
+
+def import_questions(stream, import_format="ndjson", batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate and insert the questions of a stream in batches.
+
+    Returns the import report: the imported and rejected counts, the first
+    rejected rows with their reason and the throughput in rows per second.
+    A batch the database refuses is rolled back, reported with its first
+    row, and its rows are counted as rejected.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    started = time.perf_counter()
+    imported = 0
+    rejected = 0
+    failed_batches = 0
+    rejects = []
+    batch = []
+    numbers = []
+
+    # rows of unknown categories are rejected before they reach a batch
+    categories = category_cache.get()
+
+    def reject(number, error):
+        if len(rejects) < MAX_REPORTED_REJECTS:
+            rejects.append({"row": number, "error": error})
+
+    def flush():
+        nonlocal imported, rejected, failed_batches
+
+        error = insert_batch(batch)
+        if error is None:
+            imported += len(batch)
+        else:
+            rejected += len(batch)
+            failed_batches += 1
+            reject(
+                numbers[0],
+                f"batch of rows {numbers[0]} to {numbers[-1]} not imported: {error}",
+            )
+
+        del batch[:], numbers[:]
+
+    for number, data in read_rows(stream, import_format):
+
+        # validate the row like a single question creation
+        try:
+            if data is None:
+                raise ValueError("invalid JSON")
+
+            batch.append(validate_question(data, categories))
+            numbers.append(number)
+
+        # record the rejected row and keep going
+        except ValueError as error:
+            rejected += 1
+            reject(number, str(error))
+
+        # insert and commit the batch once it is full
+        if len(batch) >= batch_size:
+            flush()
+
+    # insert the last partial batch
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - started
+
+    return {
+        "imported": imported,
+        "rejected": rejected,
+        "failed_batches": failed_batches,
+        "rejects": rejects,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round((imported + rejected) / elapsed) if elapsed else 0,
+    }
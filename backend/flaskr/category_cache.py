@@ -0,0 +1,58 @@
+import threading
+
+from flask import g
+
+from models import Category, DataVersion, CATEGORIES_VERSION, primary_reads
+
+
+class CategoryCache:
+    """
+    In-process cache of the {id: type} category map shared by all routes.
+
+    The map is tagged with the categories version stamp it was read at.
+    Every lookup compares the tag with the stamp stored in the database,
+    which every worker process bumps when it writes a category, so a cached
+    map is never served after a write.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.categories = {}
+
+    def get(self):
+
+        # the stamp and the map are read from the primary, like the indexes
+        with primary_reads():
+            return self.read()
+
+    def read(self):
+
+        # a conditional route already read the stamp, so a cached map of the
+        # same version is served without a query
+        version = g.get("data_versions", {}).get(CATEGORIES_VERSION)
+        with self.lock:
+            if version is not None and version == self.version:
+                return self.categories
+
+        # otherwise read the current version stamp, a single primary key lookup
+        version = DataVersion.current(CATEGORIES_VERSION)
+
+        with self.lock:
+
+            # reload the categories only when they were written
+            if version != self.version:
+                query_categories = Category.query.order_by(Category.id).all()
+
+                self.categories = {
+                    category.id: category.type for category in query_categories
+                }
+                self.version = version
+
+            return self.categories
+
+    def type_of(self, category_id):
+        return self.get()[category_id]
+
+
+category_cache = CategoryCache()
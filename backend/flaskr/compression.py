@@ -0,0 +1,90 @@
+import os
+import zlib
+
+from flask import current_app, request
+
+# brotli is optional, without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# content codings of the responses, preferred first
+CODINGS = ("br", "gzip")
+
+# content codings offered to the clients by this process
+ENCODINGS = CODINGS if brotli is not None else ("gzip",)
+
+# mimetypes worth compressing
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/csv", "text/plain")
+
+# compression settings, read from the app config or the environment:
+# setting name -> (default, type)
+COMPRESS_SETTINGS = {
+    "COMPRESS_MIN_SIZE": (1024, int),
+    "COMPRESS_LEVEL": (6, int),
+    "COMPRESS_BROTLI_QUALITY": (4, int),
+}
+
+
+def setting(name):
+    default, convert = COMPRESS_SETTINGS[name]
+    value = current_app.config.get(name, os.getenv(name))
+    if value is None or value == "":
+        return default
+    return convert(value)
+
+
+def gzip_compress(data, level):
+
+    # a gzip member without a timestamp, so equal bodies compress equally
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def encoded_etags(etag):
+    """Return the ETags of every encoding of a representation."""
+    return [etag] + [f"{etag}-{coding}" for coding in CODINGS]
+
+
+def compress(response):
+    """
+    Compress a response with the best coding accepted by the client.
+
+    Only complete responses of a compressible type and of at least
+    COMPRESS_MIN_SIZE bytes are compressed. An ETag gets the coding as
+    suffix, so every encoding of a representation has its own strong tag.
+    """
+
+    if (
+        response.status_code != 200
+        or response.is_streamed
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    # the body depends on the Accept-Encoding of the request from now on
+    response.vary.add("Accept-Encoding")
+
+    data = response.get_data()
+    if len(data) < setting("COMPRESS_MIN_SIZE"):
+        return response
+
+    coding = request.accept_encodings.best_match(ENCODINGS)
+    if coding is None:
+        return response
+
+    if coding == "br":
+        data = brotli.compress(data, quality=setting("COMPRESS_BROTLI_QUALITY"))
+    else:
+        data = gzip_compress(data, setting("COMPRESS_LEVEL"))
+
+    response.set_data(data)
+    response.headers["Content-Encoding"] = coding
+
+    etag, weak = response.get_etag()
+    if etag is not None:
+        response.set_etag(f"{etag}-{coding}", weak)
+
+    return response
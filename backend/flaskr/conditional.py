@@ -0,0 +1,91 @@
+import zlib
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+
+from models import DataVersion
+from .compression import encoded_etags
+
+
+def conditional(*names):
+    """
+    Answer conditional GET requests of a view from the data version stamps.
+
+    The strong ETag of a response is made of the stamps of the named tables
+    and of the requested URL, and its Last-Modified is the second of the
+    last write to them, once that second is over. A request that still holds
+    the current ETag, or that was not modified since its If-Modified-Since,
+    gets an empty 304 before the view runs any query.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+
+            # read every stamp in a single query, and keep the versions for
+            # the caches used by the view
+            stamps = DataVersion.stamps(names)
+            versions = {
+                name: version for name, (version, updated_at) in zip(names, stamps)
+            }
+
+            # build the ETag from the stamps and the URL with its arguments
+            etag = "-".join(
+                [str(version) for version, updated_at in stamps]
+                + ["%08x" % zlib.crc32(request.full_path.encode("utf-8"))]
+            )
+            modified = [updated_at for version, updated_at in stamps if updated_at]
+            last_modified = max(modified).replace(microsecond=0) if modified else None
+
+            # the dates of the headers are whole seconds, and another write may
+            # still follow within the second of the last one, so the date is
+            # only used once that second is over
+            now = datetime.utcnow().replace(microsecond=0)
+            if last_modified is not None and last_modified >= now:
+                last_modified = None
+
+            # check if the client already holds the current response,
+            # in any of its encodings
+            matched = None
+            if request.if_none_match:
+                for candidate in encoded_etags(etag):
+                    if request.if_none_match.contains(candidate):
+                        matched = candidate
+                        break
+                not_modified = matched is not None
+            else:
+                not_modified = (
+                    last_modified is not None
+                    and request.if_modified_since is not None
+                    and last_modified <= request.if_modified_since
+                )
+
+            if not_modified:
+                # with the ETag of the encoding held by the client
+                response = current_app.response_class(status=304)
+                response.set_etag(matched or etag)
+
+            # if not, run the view, with the versions only while it runs
+            else:
+                g.data_versions = versions
+                try:
+                    response = make_response(view(*args, **kwargs))
+                finally:
+                    g.pop("data_versions", None)
+
+                # only successful responses are tagged
+                if response.status_code != 200:
+                    return response
+
+                # the ETag gets the suffix of its coding once it is compressed
+                response.set_etag(etag)
+
+            if last_modified is not None:
+                response.last_modified = last_modified
+
+            return response
+
+        return wrapper
+
+    return decorator
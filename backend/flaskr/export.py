@@ -0,0 +1,59 @@
+import csv
+import io
+
+from flask import current_app
+
+from models import Question, db
+from .serialization import QUESTION_COLUMNS, QUESTION_KEYS, json_encoder
+
+# number of rows fetched from the cursor and sent in each chunk
+EXPORT_BATCH_SIZE = 1000
+
+# format -> mimetype of the export
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_questions(criteria=(), export_format="ndjson", batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yield the questions matching the criteria as chunks of NDJSON or CSV.
+
+    The rows are read through a server-side cursor, batch_size at a time,
+    and each batch is sent before the next one is read, so memory does not
+    grow with the size of the question bank.
+    """
+
+    query_questions = (
+        db.session.query(*QUESTION_COLUMNS)
+        .filter(*criteria)
+        .order_by(Question.id)
+        .execution_options(stream_results=True)
+        .yield_per(batch_size)
+    )
+
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(QUESTION_KEYS)
+
+        for count, row in enumerate(query_questions, start=1):
+            writer.writerow(row)
+
+            if count % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+
+    else:
+        encoder = json_encoder(current_app.config)
+        lines = []
+
+        for row in query_questions:
+            lines.append(encoder.encode(dict(zip(QUESTION_KEYS, row))) + "\n")
+
+            if len(lines) == batch_size:
+                yield "".join(lines)
+                lines = []
+
+        yield "".join(lines)
@@ -0,0 +1,62 @@
+from models import Question
+
+
+def integer_argument(args, name):
+    value = args.get(name)
+    if value is None or value == "":
+        return None
+
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"invalid {name}")
+
+
+def question_filters(args):
+    """
+    Build the SQL criteria of the question filters of a request.
+
+    difficulty filters one difficulty, and min_difficulty and max_difficulty
+    a range of them. categories takes a comma separated list of category ids,
+    and min_id and max_id bound the question ids.
+
+    Raises ValueError with the reason when a filter is not valid.
+    """
+
+    criteria = []
+
+    difficulty = integer_argument(args, "difficulty")
+    if difficulty is not None:
+        criteria.append(Question.difficulty == difficulty)
+
+    min_difficulty = integer_argument(args, "min_difficulty")
+    if min_difficulty is not None:
+        criteria.append(Question.difficulty >= min_difficulty)
+
+    max_difficulty = integer_argument(args, "max_difficulty")
+    if max_difficulty is not None:
+        criteria.append(Question.difficulty <= max_difficulty)
+
+    categories = args.get("categories")
+    if categories is not None:
+        try:
+            category_ids = sorted(
+                {int(category) for category in categories.split(",") if category}
+            )
+        except ValueError:
+            raise ValueError("invalid categories")
+
+        if not category_ids:
+            raise ValueError("empty categories")
+
+        criteria.append(Question.category.in_(category_ids))
+
+    min_id = integer_argument(args, "min_id")
+    if min_id is not None:
+        criteria.append(Question.id >= min_id)
+
+    max_id = integer_argument(args, "max_id")
+    if max_id is not None:
+        criteria.append(Question.id <= max_id)
+
+    return criteria
@@ -0,0 +1,181 @@
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# upper bounds of the request duration histogram, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RequestMetrics:
+    """
+    Per endpoint totals of the requests served by this process.
+
+    Every request records its wall time, its SQL statements, the time spent
+    in the database, the rows fetched and the size of its response.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        # (endpoint, method, status) -> number of requests
+        self.requests = {}
+
+        # endpoint -> totals of the requests to the endpoint
+        self.endpoints = {}
+
+    def start(self):
+        g.request_metrics = {
+            "started": time.perf_counter(),
+            "statements": 0,
+            "db_seconds": 0.0,
+            "rows": 0,
+        }
+
+    def finish(self, response):
+        current = g.pop("request_metrics", None)
+        if current is None:
+            return current
+
+        current["seconds"] = time.perf_counter() - current["started"]
+
+        # streamed responses have no length until they are sent, and
+        # asking for it would read the whole stream into memory
+        if response.is_streamed:
+            current["bytes"] = 0
+        else:
+            current["bytes"] = response.calculate_content_length() or 0
+
+        self.record(
+            request.endpoint or "unmatched",
+            request.method,
+            response.status_code,
+            current,
+        )
+
+        return current
+
+    def record(self, endpoint, method, status, current):
+        """Add a finished request to the totals of its endpoint."""
+
+        key = (endpoint, method, str(status))
+
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            totals = self.endpoints.get(endpoint)
+            if totals is None:
+                totals = self.endpoints[endpoint] = {
+                    "buckets": [0] * len(DURATION_BUCKETS),
+                    "count": 0,
+                    "seconds": 0.0,
+                    "statements": 0,
+                    "db_seconds": 0.0,
+                    "rows": 0,
+                    "bytes": 0,
+                }
+
+            totals["count"] += 1
+            for name in ("seconds", "statements", "db_seconds", "rows", "bytes"):
+                totals[name] += current[name]
+
+            for position, bound in enumerate(DURATION_BUCKETS):
+                if current["seconds"] <= bound:
+                    totals["buckets"][position] += 1
+
+    def render(self, gauges=None):
+        """Render the totals in the Prometheus text format."""
+
+        lines = [
+            "# HELP trivia_requests_total Requests served.",
+            "# TYPE trivia_requests_total counter",
+        ]
+
+        with self.lock:
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'trivia_requests_total{{endpoint="{endpoint}",'
+                    f'method="{method}",status="{status}"}} {count}'
+                )
+
+            lines += [
+                "# HELP trivia_request_duration_seconds Wall time of the requests.",
+                "# TYPE trivia_request_duration_seconds histogram",
+            ]
+            for endpoint, totals in sorted(self.endpoints.items()):
+                label = f'endpoint="{endpoint}"'
+                for bound, count in zip(DURATION_BUCKETS, totals["buckets"]):
+                    lines.append(
+                        f'trivia_request_duration_seconds_bucket{{{label},le="{bound}"}}'
+                        f" {count}"
+                    )
+                lines += [
+                    f'trivia_request_duration_seconds_bucket{{{label},le="+Inf"}}'
+                    f' {totals["count"]}',
+                    f'trivia_request_duration_seconds_sum{{{label}}} {totals["seconds"]}',
+                    f'trivia_request_duration_seconds_count{{{label}}} {totals["count"]}',
+                ]
+
+            for name, key, kind, description in (
+                ("sql_statements_total", "statements", "counter", "SQL statements"),
+                ("sql_duration_seconds_total", "db_seconds", "counter", "Time in SQL"),
+                ("sql_rows_total", "rows", "counter", "Rows fetched"),
+                ("response_bytes_total", "bytes", "counter", "Response bytes"),
+            ):
+                lines += [
+                    f"# HELP trivia_{name} {description} of the requests.",
+                    f"# TYPE trivia_{name} {kind}",
+                ]
+                for endpoint, totals in sorted(self.endpoints.items()):
+                    lines.append(
+                        f'trivia_{name}{{endpoint="{endpoint}"}} {totals[key]}'
+                    )
+
+        # add the current values given by the caller
+        for name, value in sorted((gauges or {}).items()):
+            lines += [f"# TYPE trivia_{name} gauge", f"trivia_{name} {value}"]
+
+        return "\n".join(lines) + "\n"
+
+
+def server_timing(current):
+    """Build the Server-Timing header of a finished request."""
+    return (
+        f'db;dur={current["db_seconds"] * 1000:.3f};'
+        f'desc="{current["statements"]} queries, {current["rows"]} rows", '
+        f'app;dur={current["seconds"] * 1000:.3f}'
+    )
+
+
+# time every SQL statement run while a request is measured
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def finish_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["statement_started"].pop()
+
+    if not has_request_context() or "request_metrics" not in g:
+        return
+
+    current = g.request_metrics
+    current["statements"] += 1
+    current["db_seconds"] += time.perf_counter() - started
+
+    # the drivers that know it report the rows of a SELECT in rowcount
+    if statement.lstrip()[:6].upper() == "SELECT" and cursor.rowcount > 0:
+        current["rows"] += cursor.rowcount
+
+
+@event.listens_for(Engine, "handle_error")
+def discard_statement(context):
+    started = context.connection.info.get("statement_started")
+    if started:
+        started.pop()
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,95 @@
+import threading
+
+from models import DataVersion, QUESTIONS_VERSION, db, primary_reads
+from models import question_listeners
+
+
+class QuestionIndex:
+    """
+    Base of the in-process indexes built from the questions table.
+
+    Subclasses list the question columns they read, starting with the id,
+    and add or remove one question from those values. The index is loaded
+    on first use and then kept current by the question listeners.
+
+    The index also remembers the questions version stamp it is at. Every
+    local commit moves it by one, like the stamp in the database, so any
+    difference means another process wrote questions and the index reloads.
+    The stamp and the rows are always read from the primary, as a lagging
+    replica would break the comparison.
+    """
+
+    columns = ()
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.version = None
+        self.clear()
+
+        question_listeners.append(self.apply)
+
+    def clear(self):
+        raise NotImplementedError
+
+    def add(self, question_id, *values):
+        raise NotImplementedError
+
+    def remove(self, question_id, *values):
+        raise NotImplementedError
+
+    def ensure_current(self):
+
+        # read the stamp before the rows, so writes during the load
+        # are seen as a newer stamp on the next use
+        with primary_reads():
+            version = DataVersion.current(QUESTIONS_VERSION)
+
+            if not self.is_current(version):
+                self.load(version)
+
+    def is_current(self, version):
+        with self.lock:
+            return self.loaded and version == self.version
+
+    def load(self, version):
+
+        # read only the columns used by the index
+        with primary_reads():
+            rows = db.session.query(*self.columns).all()
+
+        with self.lock:
+            self.clear()
+
+            for row in rows:
+                self.add(*row)
+
+            self.version = version
+            self.loaded = True
+
+    def reset(self):
+        with self.lock:
+            self.loaded = False
+
+    def apply(self, inserted, deleted):
+
+        # the changed questions are unknown, so reload on next use
+        if inserted is None:
+            self.reset()
+            return
+
+        # nothing to keep current until the index is used
+        if not self.loaded:
+            return
+
+        keys = [column.key for column in self.columns]
+
+        with self.lock:
+            for question in inserted:
+                self.add(*(question[key] for key in keys))
+
+            for question in deleted:
+                self.remove(*(question[key] for key in keys))
+
+            # the commit moved the stamp in the database by one
+            self.version += 1
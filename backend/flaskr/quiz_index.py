@@ -0,0 +1,172 @@
+import random
+
+from models import Question
+from .question_index import QuestionIndex
+
+# key used for the "ALL" quiz, which draws from every category
+ALL_CATEGORIES = 0
+
+# random draws tried per question before listing every unseen question
+DRAW_ATTEMPTS = 8
+
+
+class QuizIndex(QuestionIndex):
+    """
+    In-process index of question ids per category used to draw quiz questions.
+
+    The ids are loaded once and then kept current by the question listeners,
+    so picking the next question never scans the questions table.
+    """
+
+    columns = (Question.id, Question.category)
+
+    def clear(self):
+
+        # category -> list of question ids
+        self.ids = {}
+
+        # category -> {question id: position in the ids list}
+        self.positions = {}
+
+    def pick(self, category, previous_questions):
+
+        # load the index on first use, or after writes from other processes
+        self.ensure_current()
+
+        return self.draw(category, previous_questions)
+
+    def draw(self, category, previous_questions):
+
+        # draw from the index as it is, the caller keeps it current
+        with self.lock:
+            ids, seen = self._seen_positions(category, previous_questions)
+
+            # check if there is any unseen question left
+            remaining = len(ids) - len(seen)
+            if remaining <= 0:
+                return None
+
+            # draw the n-th unseen question
+            return ids[unseen_position(random.randrange(remaining), seen)]
+
+    def deal(self, category, previous_questions, count):
+
+        # load the index on first use, or after writes from other processes
+        self.ensure_current()
+
+        with self.lock:
+            ids, seen = self._seen_positions(category, previous_questions)
+
+            # sample up to count unseen questions, already in random order
+            remaining = max(len(ids) - len(seen), 0)
+            return [
+                ids[unseen_position(n, seen)]
+                for n in random.sample(range(remaining), min(count, remaining))
+            ]
+
+    def _seen_positions(self, category, previous_questions):
+
+        # find where the previous questions sit in the category list
+        ids = self.ids.get(category, [])
+        positions = self.positions.get(category, {})
+        seen = sorted({positions[i] for i in previous_questions if i in positions})
+        return ids, seen
+
+    def deal_unseen(self, category, has_seen, count):
+
+        # load the index on first use, or after writes from other processes
+        self.ensure_current()
+
+        return self.draw_unseen(category, has_seen, count)
+
+    def draw_unseen(self, category, has_seen, count):
+        """
+        Draw up to count questions not seen by a quiz session, in random order.
+
+        Random draws are tried first, so a turn takes constant time while
+        most of the category is unseen.
+        """
+        with self.lock:
+            ids = self.ids.get(category, [])
+
+            drawn = []
+            if ids:
+                for _ in range(count * DRAW_ATTEMPTS):
+                    question_id = ids[random.randrange(len(ids))]
+                    if question_id not in drawn and not has_seen(question_id):
+                        drawn.append(question_id)
+                        if len(drawn) == count:
+                            return drawn
+
+            # the category is mostly seen, so list what is left
+            unseen = [i for i in ids if i not in drawn and not has_seen(i)]
+            return drawn + random.sample(unseen, min(count - len(drawn), len(unseen)))
+
+    def add(self, question_id, category):
+        for key in (ALL_CATEGORIES, category_key(category)):
+            positions = self.positions.setdefault(key, {})
+
+            if question_id not in positions:
+                ids = self.ids.setdefault(key, [])
+                positions[question_id] = len(ids)
+                ids.append(question_id)
+
+    def remove(self, question_id, category):
+        for key in (ALL_CATEGORIES, category_key(category)):
+            positions = self.positions.get(key, {})
+
+            if question_id in positions:
+                ids = self.ids[key]
+
+                # swap the last id into the removed slot to keep removal O(1)
+                position = positions.pop(question_id)
+                last_id = ids.pop()
+                if last_id != question_id:
+                    ids[position] = last_id
+                    positions[last_id] = position
+
+
+def unseen_position(n, seen):
+
+    # find the n-th unseen position, skipping over the sorted seen positions
+    position = n
+    for seen_position in seen:
+        if seen_position <= position:
+            position += 1
+        else:
+            break
+
+    return position
+
+
+def quiz_category(data):
+    """
+    Return the category key of the quiz_category of a quiz request: 0 plays
+    every category, and a missing category raises a LookupError.
+    """
+
+    # retrieve the category type from data
+    category_type = data["quiz_category"]["id"]
+
+    # if there is no specific category, play from all questions
+    if category_type == 0:
+        return ALL_CATEGORIES
+
+    # if the category exists, play from its questions
+    if category_type:
+        return int(category_type)
+
+    # if the category is missing, the quiz is not found
+    raise LookupError(category_type)
+
+
+def category_key(category):
+
+    # categories arrive as strings or integers, so normalize them
+    try:
+        return int(category)
+    except (TypeError, ValueError):
+        return None
+
+
+quiz_index = QuizIndex()
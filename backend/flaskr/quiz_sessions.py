@@ -0,0 +1,213 @@
+import os
+import secrets
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+# redis is only needed to share the sessions between workers
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# seconds a session lives after its last use
+SESSION_TTL = 3600
+
+# sessions kept by the in-memory store, the least recently used are dropped
+SESSION_MAX = 10000
+
+# header of a stored session: its category, followed by the seen ids,
+# both little-endian so every worker reads what another one stored
+SESSION_HEADER = struct.Struct("<q")
+SEEN_ID = struct.Struct("<I")
+
+
+class QuizSession:
+    """
+    State of a quiz on the server: its category and the set of questions it
+    has already shown.
+
+    A quiz sees a few questions out of many, so the seen ids are kept as a
+    set, and stored as a packed array of 4 bytes per id. A bitmap would grow
+    with the highest question id instead.
+    """
+
+    def __init__(self, category, seen=()):
+        self.category = category
+        self.seen = set(seen)
+
+    def has_seen(self, question_id):
+        return question_id in self.seen
+
+    def mark(self, question_id):
+        self.seen.add(question_id)
+
+    def dumps(self):
+        return SESSION_HEADER.pack(self.category) + struct.pack(
+            f"<{len(self.seen)}I", *self.seen
+        )
+
+    @classmethod
+    def loads(cls, data):
+        (category,) = SESSION_HEADER.unpack_from(data)
+        count = (len(data) - SESSION_HEADER.size) // SEEN_ID.size
+        seen = struct.unpack_from(f"<{count}I", data, SESSION_HEADER.size)
+        return cls(category, seen)
+
+
+class MemorySessionStore:
+    """
+    Sessions kept in the worker, up to `max_sessions`, for `ttl` seconds
+    after their last use.
+    """
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=SESSION_MAX):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.lock = threading.Lock()
+
+        # session id -> (session, expiry time), least recently used first
+        self.sessions = OrderedDict()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.sessions.pop(session_id, None)
+            if entry is None or entry[1] <= now:
+                return None
+
+            self.sessions[session_id] = (entry[0], now + self.ttl)
+            return entry[0]
+
+    def put(self, session_id, session):
+        now = time.monotonic()
+        with self.lock:
+            self.sessions.pop(session_id, None)
+            self.sessions[session_id] = (session, now + self.ttl)
+
+            # drop the expired sessions, then the least recently used ones
+            while self.sessions:
+                oldest_id, (oldest, expiry) = next(iter(self.sessions.items()))
+                if expiry > now and len(self.sessions) <= self.max_sessions:
+                    break
+                del self.sessions[oldest_id]
+
+    def delete(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class SharedSessionStore:
+    """
+    Sessions kept in a key-value store shared by every worker, like Redis.
+
+    The client needs the get, set with `ex` and delete methods of redis-py.
+    Every session is stored as its category and a packed array of its seen
+    question ids, and expires `ttl` seconds after its last use.
+    """
+
+    prefix = "quiz_session:"
+
+    def __init__(self, client, ttl=SESSION_TTL):
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, session_id):
+        data = self.client.get(self.prefix + session_id)
+        if data is None:
+            return None
+
+        session = QuizSession.loads(data)
+        self.put(session_id, session)
+        return session
+
+    def put(self, session_id, session):
+        self.client.set(self.prefix + session_id, session.dumps(), ex=int(self.ttl))
+
+    def delete(self, session_id):
+        self.client.delete(self.prefix + session_id)
+
+
+class LocalKeyValue:
+    """
+    In-process stand-in of a shared key-value store, with the get, set and
+    delete methods of redis-py, for tests and single worker deployments.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        # key -> (value, expiry time or None)
+        self.values = {}
+
+    def get(self, name):
+        with self.lock:
+            value, expiry = self.values.get(name, (None, None))
+            if expiry is not None and expiry <= time.monotonic():
+                del self.values[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None):
+        with self.lock:
+            expiry = time.monotonic() + ex if ex else None
+            self.values[name] = (bytes(value), expiry)
+
+    def delete(self, name):
+        with self.lock:
+            self.values.pop(name, None)
+
+
+class QuizSessions:
+    """The quiz sessions of the app, in the store set by setup_quiz_sessions."""
+
+    def __init__(self, store=None):
+        self.store = store or MemorySessionStore()
+
+    def create(self, category):
+        session_id, session = self.start(category)
+        self.store.put(session_id, session)
+        return session_id
+
+    def start(self, category):
+        """Return the id and the session of a new quiz, saved on first save."""
+        return secrets.token_urlsafe(16), QuizSession(category)
+
+    def get(self, session_id):
+        if not isinstance(session_id, str):
+            return None
+        return self.store.get(session_id)
+
+    def save(self, session_id, session):
+        self.store.put(session_id, session)
+
+
+def setup_quiz_sessions(app):
+    """Set the session store from the app config or the environment."""
+
+    def setting(name, default):
+        value = app.config.get(name, os.getenv(name))
+        return default if value is None or value == "" else value
+
+    url = setting("QUIZ_SESSION_STORE", "memory")
+    ttl = float(setting("QUIZ_SESSION_TTL", SESSION_TTL))
+
+    if url == "memory":
+        store = MemorySessionStore(ttl, int(setting("QUIZ_SESSION_MAX", SESSION_MAX)))
+    elif url == "local":
+        store = SharedSessionStore(LocalKeyValue(), ttl)
+    else:
+        if redis is None:
+            raise RuntimeError(
+                "QUIZ_SESSION_STORE needs the packages of requirements-sessions.txt"
+            )
+        store = SharedSessionStore(redis.Redis.from_url(url), ttl)
+
+    quiz_sessions.store = store
+
+
+quiz_sessions = QuizSessions()
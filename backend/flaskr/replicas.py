@@ -0,0 +1,86 @@
+import os
+import time
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+
+from models import replicas
+
+# cookie with the time of the last write of a client
+LAST_WRITE_COOKIE = "last_write"
+
+
+def staleness(app):
+    """Seconds after a write in which the client reads from the primary."""
+    return float(
+        app.config.get("DB_REPLICA_STALENESS", os.getenv("DB_REPLICA_STALENESS")) or 0
+    )
+
+
+def wrote_recently():
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, 0))
+    except ValueError:
+        return False
+
+    return time.time() - last_write < staleness(current_app)
+
+
+def read_only(view):
+    """
+    Send the reads of a view to a read replica, when replicas are configured.
+
+    A client that wrote in the last DB_REPLICA_STALENESS seconds keeps
+    reading from the primary, so it always reads its own writes.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+
+        if wrote_recently():
+            return view(*args, **kwargs)
+
+        position = replicas.acquire()
+        if position is None:
+            return view(*args, **kwargs)
+
+        g.db_replica = replicas.engines[position]
+        try:
+            response = make_response(view(*args, **kwargs))
+
+        except BaseException:
+            g.pop("db_replica", None)
+            replicas.release(position)
+            raise
+
+        # a streamed response keeps reading from the replica until it is sent
+        if response.is_streamed:
+            response.call_on_close(lambda: replicas.release(position))
+        else:
+            g.pop("db_replica", None)
+            replicas.release(position)
+
+        return response
+
+    return wrapper
+
+
+def remember_write(response):
+    """Mark the client of a successful write, for the reads that follow it."""
+
+    window = staleness(current_app)
+    if (
+        window
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and not g.get("db_read_only")
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            f"{time.time():.3f}",
+            max_age=int(window) + 1,
+            httponly=True,
+        )
+
+    return response
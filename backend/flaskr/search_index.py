@@ -0,0 +1,238 @@
+import bisect
+import math
+import os
+import re
+from collections import Counter
+
+from models import Question
+from .question_index import QuestionIndex
+
+# words are runs of letters and digits, compared in lower case
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# weight of a prefix or an infix match compared to an exact word match
+PREFIX_WEIGHT = 0.5
+INFIX_WEIGHT = 0.25
+
+# lowest trigram similarity of a fuzzy match, like the pg_trgm default
+FUZZY_THRESHOLD = 0.3
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def trigrams(word):
+    """Return the trigrams of a word, padded like pg_trgm does."""
+    padded = f"  {word} "
+    return {padded[position : position + 3] for position in range(len(word) + 1)}
+
+
+def fuzzy_threshold(app):
+    """Lowest similarity of the words matched by a fuzzy search."""
+    return float(
+        app.config.get("SEARCH_FUZZY_THRESHOLD", os.getenv("SEARCH_FUZZY_THRESHOLD"))
+        or FUZZY_THRESHOLD
+    )
+
+
+class SearchIndex(QuestionIndex):
+    """
+    In-process inverted index over the question text.
+
+    Every word maps to the questions that contain it. A search term matches
+    the questions it is a substring of, like ILIKE '%term%': the indexed
+    words that contain each of its words, found with a trigram index of the
+    words, give the candidates, and each candidate is confirmed against its
+    lower case text. The results are ranked with tf-idf, so no row is read
+    to find or count the matches.
+
+    A fuzzy search matches the questions with a word containing, or similar
+    to, each word of the search term instead, weighted by their similarity,
+    so a typo still finds its questions.
+    """
+
+    columns = (Question.id, Question.question)
+
+    def clear(self):
+
+        # word -> {question id: number of occurrences}
+        self.postings = {}
+
+        # sorted list of the indexed words, used to expand prefixes
+        self.terms = []
+
+        # trigram -> indexed words that contain it, used to find the words
+        # containing or similar to a search word
+        self.trigrams = {}
+
+        # question id -> lower case text of every indexed question
+        self.documents = {}
+
+    def search(self, search_term, offset, limit, fuzzy_threshold=None):
+
+        # load the index on first use, or after writes from other processes
+        self.ensure_current()
+
+        words = tokenize(search_term)
+        needle = (search_term or "").lower()
+
+        with self.lock:
+
+            # a search term without words is only found in the texts, in id order
+            if not words:
+                ranked = sorted(
+                    question_id
+                    for question_id, text in self.documents.items()
+                    if needle in text
+                )
+                return len(ranked), ranked[offset : offset + limit]
+
+            scores = None
+            for word in set(words):
+                word_scores = self._score_word(word, fuzzy_threshold)
+
+                # every word of the search term must match
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {
+                        question_id: score + word_scores[question_id]
+                        for question_id, score in scores.items()
+                        if question_id in word_scores
+                    }
+
+                if not scores:
+                    return 0, []
+
+            # the words only select the candidates, the whole search term
+            # must still be in the text, unless it is a single word
+            if fuzzy_threshold is None and words != [needle]:
+                scores = {
+                    question_id: score
+                    for question_id, score in scores.items()
+                    if needle in self.documents[question_id]
+                }
+
+            # rank by score, then by id to keep the pages stable
+            ranked = sorted(
+                scores, key=lambda question_id: (-scores[question_id], question_id)
+            )
+
+            return len(ranked), ranked[offset : offset + limit]
+
+    def _score_word(self, word, fuzzy_threshold=None):
+
+        # indexed word -> weight of its match
+        weights = {}
+
+        # every indexed word that contains the search word
+        for term in self._terms_containing(word):
+            if term == word:
+                weights[term] = 1.0
+            elif term.startswith(word):
+                weights[term] = PREFIX_WEIGHT
+            else:
+                weights[term] = INFIX_WEIGHT
+
+        # add the similar words, weighted by their similarity
+        if fuzzy_threshold is not None:
+            for term, similarity in self._similar_terms(word, fuzzy_threshold):
+                weights[term] = max(weights.get(term, 0), similarity)
+
+        scores = {}
+        total_documents = max(len(self.documents), 1)
+
+        for term, weight in weights.items():
+            postings = self.postings[term]
+            idf = math.log(1 + total_documents / len(postings))
+
+            for question_id, frequency in postings.items():
+                scores[question_id] = (
+                    scores.get(question_id, 0) + weight * frequency * idf
+                )
+
+        return scores
+
+    def _terms_containing(self, word):
+
+        # a word shorter than a trigram is looked for in every indexed word
+        if len(word) < 3:
+            return [term for term in self.terms if word in term]
+
+        # the words holding every trigram of the search word are the
+        # candidates, starting from the rarest trigram
+        candidates = sorted(
+            (
+                self.trigrams.get(word[position : position + 3], set())
+                for position in range(len(word) - 2)
+            ),
+            key=len,
+        )
+        return [term for term in set.intersection(*candidates) if word in term]
+
+    def _similar_terms(self, word, threshold):
+        word_trigrams = trigrams(word)
+
+        # count the trigrams shared with every indexed word sharing any,
+        # so only those words are compared
+        shared = Counter()
+        for trigram in word_trigrams:
+            shared.update(self.trigrams.get(trigram, ()))
+
+        # keep the words whose similarity, like pg_trgm's, reaches the threshold
+        for term, count in shared.items():
+
+            # the union has at least the trigrams of the search word
+            if count < threshold * len(word_trigrams):
+                continue
+
+            similarity = count / (len(word_trigrams) + len(trigrams(term)) - count)
+            if similarity >= threshold:
+                yield term, similarity
+
+    def add(self, question_id, text):
+        if question_id in self.documents:
+            return
+
+        self.documents[question_id] = (text or "").lower()
+
+        for term, frequency in Counter(tokenize(text)).items():
+            postings = self.postings.get(term)
+
+            # register the new word in the sorted word list
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self.terms, term)
+
+                for trigram in trigrams(term):
+                    self.trigrams.setdefault(trigram, set()).add(term)
+
+            postings[question_id] = frequency
+
+    def remove(self, question_id, text):
+        if question_id not in self.documents:
+            return
+
+        del self.documents[question_id]
+
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+
+            postings.pop(question_id, None)
+
+            # forget the word once no question uses it
+            if not postings:
+                del self.postings[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+
+                for trigram in trigrams(term):
+                    words = self.trigrams[trigram]
+                    words.discard(term)
+                    if not words:
+                        del self.trigrams[trigram]
+
+
+search_index = SearchIndex()
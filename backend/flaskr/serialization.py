@@ -0,0 +1,56 @@
+import json
+
+from flask import current_app, jsonify
+
+from models import Question
+
+# keys of Question.format(), in the order of the selected columns
+QUESTION_KEYS = ("id", "question", "answer", "category", "difficulty")
+
+# columns selected instead of whole Question objects on the read paths
+QUESTION_COLUMNS = tuple(getattr(Question, key) for key in QUESTION_KEYS)
+
+# compact encoders built once, one per JSON_AS_ASCII setting
+encoders = {}
+
+
+def format_rows(rows):
+    """Build the Question.format() dictionaries from selected column tuples."""
+    return [dict(zip(QUESTION_KEYS, row)) for row in rows]
+
+
+def json_encoder(config):
+    """Return the compact encoder of an app configuration, built once."""
+
+    key = (config["JSON_AS_ASCII"], config["JSON_SORT_KEYS"])
+    encoder = encoders.get(key)
+
+    if encoder is None:
+        encoder = encoders[key] = json.JSONEncoder(
+            ensure_ascii=config["JSON_AS_ASCII"],
+            sort_keys=config["JSON_SORT_KEYS"],
+            separators=(",", ":"),
+        )
+
+    return encoder
+
+
+def json_response(payload):
+    """
+    Serialize a payload to the same bytes as jsonify, with a cached encoder.
+
+    jsonify builds an encoder with Flask's defaults on every call. The
+    compact output does not need them, so this reuses one C encoder.
+    Pretty printed output still goes through jsonify.
+    """
+
+    config = current_app.config
+
+    # keep the pretty printed output of debug mode
+    if config["JSONIFY_PRETTYPRINT_REGULAR"] or current_app.debug:
+        return jsonify(payload)
+
+    return current_app.response_class(
+        json_encoder(config).encode(payload) + "\n",
+        mimetype=config["JSONIFY_MIMETYPE"],
+    )
@@ -0,0 +1,155 @@
+import bisect
+import heapq
+import time
+
+from models import Question
+from .question_index import QuestionIndex
+from .search_index import tokenize
+
+# number of suggestions kept on every node of the trie
+SUGGEST_SIZE = 10
+
+# seconds between two checks of the questions stamp, so typing does not
+# run a query on every key; local writes are applied at once anyway
+SUGGEST_MAX_AGE = 1.0
+
+
+class TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+
+        # character -> child node
+        self.children = {}
+
+        # best words under the node as (-questions, word), or None when
+        # it has to be rebuilt from the subtree
+        self.top = []
+
+
+class SuggestIndex(QuestionIndex):
+    """
+    In-process prefix index of the words of the questions, for typeahead.
+
+    Every node of the trie keeps the SUGGEST_SIZE words under it used by the
+    most questions, so a suggestion only walks the characters of the prefix.
+    The cached words are updated with every added or removed question, and
+    a node whose list lost a word it cannot replace rebuilds it on next use.
+    """
+
+    columns = (Question.id, Question.question)
+
+    def clear(self):
+        self.root = TrieNode()
+
+        # word -> number of questions that contain it
+        self.counts = {}
+
+        # ids of every indexed question
+        self.documents = set()
+
+        self.checked = None
+
+    def suggest(self, prefix, limit=SUGGEST_SIZE):
+        """
+        Return the words starting with the last word of the prefix, used by
+        the most questions, each completing the prefix.
+        """
+
+        # check the stamp for writes from other processes once in a while
+        now = time.monotonic()
+        if self.checked is None or now - self.checked >= SUGGEST_MAX_AGE:
+            self.ensure_current()
+            self.checked = now
+
+        words = tokenize(prefix)
+        if not words or not prefix[-1:].isalnum():
+            return []
+
+        # keep the text typed before the last word
+        head = prefix[: len(prefix) - len(words[-1])]
+
+        with self.lock:
+            node = self.root
+            for character in words[-1]:
+                node = node.children.get(character)
+                if node is None:
+                    return []
+
+            if node.top is None:
+                node.top = self._best_words(node, words[-1])
+
+            return [head + word for count, word in node.top[:limit]]
+
+    def _best_words(self, node, prefix):
+
+        # walk the subtree, with the word spelled by every node
+        candidates = []
+        stack = [(node, prefix)]
+        while stack:
+            node, word = stack.pop()
+            if word in self.counts:
+                candidates.append((-self.counts[word], word))
+            for character, child in node.children.items():
+                stack.append((child, word + character))
+
+        return heapq.nsmallest(SUGGEST_SIZE, candidates)
+
+    def _update(self, word, count, previous):
+        node = self.root
+        path = [node]
+        for character in word:
+            node = node.children.setdefault(character, TrieNode())
+            path.append(node)
+
+        entry = (-count, word)
+        for node in path:
+            if node.top is None:
+                continue
+
+            full = len(node.top) == SUGGEST_SIZE
+            listed = previous and (-previous, word) in node.top
+            if listed:
+                node.top.remove((-previous, word))
+
+                # a full list that lowered a word may miss a better one
+                if full and count < previous:
+                    node.top = None
+                    continue
+
+            if count:
+                bisect.insort(node.top, entry)
+                del node.top[SUGGEST_SIZE:]
+
+    def add(self, question_id, text):
+        if question_id in self.documents:
+            return
+
+        self.documents.add(question_id)
+
+        for word in set(tokenize(text)):
+            previous = self.counts.get(word, 0)
+            self.counts[word] = previous + 1
+            self._update(word, previous + 1, previous)
+
+    def remove(self, question_id, text):
+        if question_id not in self.documents:
+            return
+
+        self.documents.discard(question_id)
+
+        for word in set(tokenize(text)):
+            previous = self.counts.get(word)
+            if previous is None:
+                continue
+
+            # forget the word once no question uses it
+            if previous == 1:
+                del self.counts[word]
+            else:
+                self.counts[word] = previous - 1
+
+            self._update(word, previous - 1, previous)
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,47 @@
+QUESTION_FIELDS = ("question", "answer", "difficulty", "category")
+
+# range of the integer columns of the questions table
+INTEGER_RANGE = (-(2**31), 2**31 - 1)
+
+
+def validate_question(data, categories=None):
+    """
+    Check the data of a new question and return its question_data dictionary.
+
+    When the {id: type} map of the categories is given, the category must
+    be one of them. Raises ValueError with the reason when the data is not
+    valid.
+    """
+
+    # create the question_data dictionary from data
+    try:
+        question_data = {field: data[field] for field in QUESTION_FIELDS}
+    except KeyError as error:
+        raise ValueError(f"missing field {error}")
+    except TypeError:
+        raise ValueError("the question must be an object")
+
+    # the question and the answer cannot be empty
+    for field in ("question", "answer"):
+        if question_data[field] is None or question_data[field] == "":
+            raise ValueError(f"empty {field}")
+
+    # the category and the difficulty must be integers
+    for field in ("category", "difficulty"):
+        if question_data[field] is None or question_data[field] == "":
+            raise ValueError(f"empty {field}")
+
+        try:
+            question_data[field] = int(question_data[field])
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid {field}")
+
+        # the database rejects the integers its columns cannot hold
+        if not INTEGER_RANGE[0] <= question_data[field] <= INTEGER_RANGE[1]:
+            raise ValueError(f"{field} out of range")
+
+    # the category must exist, when the caller knows the categories
+    if categories is not None and question_data["category"] not in categories:
+        raise ValueError("unknown category")
+
+    return question_data
@@ -0,0 +1,82 @@
+"""initial schema
+
+Creates the categories and questions tables on an empty database, and the
+data_versions and question_counts tables next to the ones of trivia.psql.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    existing = sa.inspect(op.get_bind()).get_table_names()
+
+    # the trivia.psql dump already creates these two tables
+    if "categories" not in existing:
+        op.create_table(
+            "categories",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("type", sa.String()),
+        )
+
+    if "questions" not in existing:
+        op.create_table(
+            "questions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("question", sa.String()),
+            sa.Column("answer", sa.String()),
+            sa.Column("category", sa.String()),
+            sa.Column("difficulty", sa.Integer()),
+        )
+
+    data_versions = op.create_table(
+        "data_versions",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "question_counts",
+        sa.Column("category", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+    )
+
+    # start the version stamps of the existing data
+    updated_at = datetime.utcnow().replace(microsecond=0)
+    op.bulk_insert(
+        data_versions,
+        [
+            {"name": "questions", "version": 1, "updated_at": updated_at},
+            {"name": "categories", "version": 1, "updated_at": updated_at},
+        ],
+    )
+
+    # fill the counters from the existing questions
+    op.execute(
+        "INSERT INTO question_counts (category, total) "
+        "SELECT CAST(category AS INTEGER), COUNT(*) FROM questions "
+        "WHERE category IS NOT NULL GROUP BY category"
+    )
+    op.execute(
+        "INSERT INTO question_counts (category, total) "
+        "SELECT 0, COUNT(*) FROM questions"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("question_counts")
+    op.drop_table("data_versions")
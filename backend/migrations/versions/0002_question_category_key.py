@@ -0,0 +1,63 @@
+"""question category key
+
+Types questions.category as an integer foreign key to categories, like the
+trivia.psql dump does, and indexes it alone and with the difficulty.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    columns = {column["name"]: column for column in inspector.get_columns("questions")}
+    typed = isinstance(columns["category"]["type"], sa.Integer)
+    keyed = any(
+        key["referred_table"] == "categories"
+        for key in inspector.get_foreign_keys("questions")
+    )
+
+    # the dump already has both, only the tables of the first
+    # migration on an empty database need them
+    if not (typed and keyed):
+        with op.batch_alter_table("questions") as batch:
+            if not typed:
+                batch.alter_column(
+                    "category",
+                    existing_type=sa.String(),
+                    type_=sa.Integer(),
+                    postgresql_using="category::integer",
+                )
+
+            if not keyed:
+                batch.create_foreign_key(
+                    "category",
+                    "categories",
+                    ["category"],
+                    ["id"],
+                    onupdate="CASCADE",
+                    ondelete="SET NULL",
+                )
+
+    op.create_index("ix_questions_category", "questions", ["category"])
+    op.create_index(
+        "ix_questions_category_difficulty", "questions", ["category", "difficulty"]
+    )
+
+
+def downgrade() -> None:
+    # the column keeps its type and key, which the dump also has
+    op.drop_index("ix_questions_category_difficulty", table_name="questions")
+    op.drop_index("ix_questions_category", table_name="questions")
@@ -0,0 +1,27 @@
+"""question difficulty index
+
+Indexes the questions by difficulty and id, for the difficulty filters of
+GET /questions and their pages in id order. The category filters use the
+indexes of 0002.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_questions_difficulty_id", "questions", ["difficulty", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_questions_difficulty_id", table_name="questions")
@@ -1,8 +1,10 @@
 import React, { Component } from 'react';
+import $ from 'jquery';
 
 class Search extends Component {
   state = {
     query: '',
+    suggestions: [],
   };
 
   getInfo = (event) => {
@@ -14,6 +16,31 @@ class Search extends Component {
     this.setState({
       query: this.search.value,
     });
+    this.getSuggestions(this.search.value);
+  };
+
+  getSuggestions = (prefix) => {
+    if (!prefix.trim()) {
+      this.setState({ suggestions: [] });
+      return;
+    }
+
+    $.ajax({
+      url: `/questions/suggest?prefix=${encodeURIComponent(prefix)}`,
+      type: 'GET',
+      success: (result) => {
+        // keep only the suggestions of the text still in the box
+        if (prefix === this.state.query) {
+          this.setState({ suggestions: result.suggestions });
+        }
+        return;
+      },
+      error: (error) => {
+        // typing goes on without suggestions
+        this.setState({ suggestions: [] });
+        return;
+      },
+    });
   };
 
   render() {
@@ -23,7 +50,14 @@ class Search extends Component {
           placeholder='Search questions...'
           ref={(input) => (this.search = input)}
           onChange={this.handleInputChange}
+          list='search-suggestions'
+          autoComplete='off'
         />
+        <datalist id='search-suggestions'>
+          {this.state.suggestions.map((suggestion) => (
+            <option key={suggestion} value={suggestion} />
+          ))}
+        </datalist>
         <input type='submit' value='Submit' className='button' />
       </form>
     );